@@ -0,0 +1,315 @@
+"""
+Хранилище резервных копий с адресацией по содержимому.
+
+Каждое уникальное содержимое хранится один раз в objects/<xx>/<sha256>[.gz],
+индекс index.jsonl сопоставляет исходный путь, размер и mtime с объектом.
+Индекс дописывается построчно, поэтому его могут одновременно пополнять
+несколько рабочих процессов.
+
+Стратегии копирования в порядке предпочтения для режима "auto":
+  "reflink"         - клонирование блоков файловой системы (ioctl FICLONE: btrfs, xfs)
+  "copy_file_range" - копирование в ядре (os.copy_file_range или os.sendfile)
+  "copy"            - обычное копирование shutil.copy2
+
+Стратегия "hardlink" (жесткая ссылка, если исходный файл и копия на одной файловой
+системе) в режим "auto" не входит и используется только при явном выборе: объект
+хранилища разделяет с исходным файлом данные, и перезапись исходного файла на месте
+(стенд дописывает файл, режим watch обрабатывает измененные файлы) незаметно изменит
+копию и все ссылки индекса на это содержимое. Выбирайте ее, только если исходные
+файлы никогда не изменяются на месте.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BACKUP_STRATEGIES = ("auto", "reflink", "hardlink", "copy_file_range", "copy")
+
+# Уровень сжатия объектов (xlsx уже сжат, поэтому используется быстрый уровень)
+COMPRESS_LEVEL = 1
+
+_BLOCK_SIZE = 1 << 20
+
+# Номер ioctl FICLONE в Linux
+_FICLONE = 0x40049409
+
+# Ошибки, означающие что стратегия не поддерживается и нужно попробовать следующую
+_UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EMLINK,
+                errno.EPERM, errno.EBADF}
+
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def reflink(source, target):
+    """Клонирует файл через ioctl FICLONE (данные разделяются до первой записи)."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "FICLONE недоступен на этой платформе")
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            _remove_partial(target)
+            raise
+    shutil.copystat(source, target)
+
+
+def hardlink(source, target):
+    """Создает жесткую ссылку, если файлы находятся на одной файловой системе."""
+    target_dir = os.path.dirname(os.path.abspath(target))
+    if os.stat(source).st_dev != os.stat(target_dir).st_dev:
+        raise OSError(errno.EXDEV, "Исходный файл и копия на разных файловых системах")
+    os.link(source, target)
+
+
+def kernel_copy(source, target):
+    """Копирует файл средствами ядра без передачи данных через пространство пользователя."""
+    copy_range = getattr(os, "copy_file_range", None)
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        try:
+            while remaining > 0:
+                if copy_range is not None:
+                    copied = copy_range(src.fileno(), dst.fileno(), remaining)
+                else:
+                    copied = os.sendfile(dst.fileno(), src.fileno(), None, remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except (OSError, AttributeError):
+            dst.close()
+            _remove_partial(target)
+            raise
+    shutil.copystat(source, target)
+
+
+def plain_copy(source, target):
+    """Обычное копирование с сохранением метаданных."""
+    shutil.copy2(source, target)
+
+
+_STRATEGY_FUNCTIONS = {
+    "reflink": reflink,
+    "hardlink": hardlink,
+    "copy_file_range": kernel_copy,
+    "copy": plain_copy,
+}
+
+
+def clone_file(source, target, strategy="auto"):
+    """
+    Копирует файл выбранной стратегией.
+
+    В режиме "auto" пробуются reflink и копирование в ядре, пока одна из стратегий
+    не сработает; обычное копирование используется как последний вариант.
+    Жесткая ссылка создается только при strategy="hardlink".
+
+    Args:
+        source (str): Путь к исходному файлу
+        target (str): Путь к копии (не должен существовать)
+        strategy (str): Одна из BACKUP_STRATEGIES
+
+    Returns:
+        str: Имя использованной стратегии
+    """
+    if strategy not in BACKUP_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия резервного копирования: {strategy}")
+
+    if strategy != "auto":
+        _STRATEGY_FUNCTIONS[strategy](source, target)
+        return strategy
+
+    for name in ("reflink", "copy_file_range"):
+        try:
+            _STRATEGY_FUNCTIONS[name](source, target)
+            return name
+        except (OSError, AttributeError) as e:
+            if isinstance(e, OSError) and e.errno not in _UNSUPPORTED:
+                raise
+    plain_copy(source, target)
+    return "copy"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """
+    Хранилище резервных копий с дедупликацией по SHA-256 содержимого.
+
+    Проверка "копия уже есть" выполняется по индексу в памяти (путь, размер,
+    mtime_ns) без обращений к файловой системе.
+
+    Args:
+        root (str): Каталог хранилища
+        compress (bool): Сжимать объекты gzip; без сжатия (по умолчанию) объекты
+                         создаются через clone_file выбранной стратегией
+        strategy (str): Стратегия копирования для несжатых объектов
+    """
+
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, root, compress=False, strategy="auto"):
+        self.root = root
+        self.compress = compress
+        self.strategy = strategy
+        self.files = {}
+        self.objects = {}
+        self._load_index()
+
+    def _load_index(self):
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Недописанная строка после аварийного завершения
+                self.files[record["path"]] = record
+                self.objects[record["object"]] = record["stored"]
+
+    def _append_index(self, record):
+        os.makedirs(self.root, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        # Одна запись одним вызовом write в режиме дозаписи
+        fd = os.open(os.path.join(self.root, self.INDEX_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        self.files[record["path"]] = record
+        self.objects[record["object"]] = record["stored"]
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def lookup(self, path, stat=None):
+        """
+        Возвращает запись индекса для текущей версии файла.
+
+        Returns:
+            dict или None: Запись, если файл с тем же размером и mtime уже сохранен
+        """
+        record = self.files.get(self._key(path))
+        if record is None:
+            return None
+        stat = stat or os.stat(path)
+        if record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return record
+
+    def is_backed_up(self, path, stat=None):
+        """Проверяет, что текущая версия файла уже сохранена."""
+        return self.lookup(path, stat) is not None
+
+    def _store_object(self, path, digest):
+        extension = ".gz" if self.compress else ""
+        stored = os.path.join("objects", digest[:2], digest + extension)
+        target = os.path.join(self.root, stored)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+
+        try:
+            if self.compress:
+                compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # формат gzip
+                with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                    for block in iter(lambda: src.read(_BLOCK_SIZE), b""):
+                        dst.write(compressor.compress(block))
+                    dst.write(compressor.flush())
+                strategy = "gzip"
+            else:
+                strategy = clone_file(path, tmp_path, self.strategy)
+            os.replace(tmp_path, target)
+        except BaseException:
+            _remove_partial(tmp_path)
+            raise
+        return stored, strategy
+
+    def backup(self, path):
+        """
+        Сохраняет файл в хранилище, если его текущая версия еще не сохранена.
+
+        Returns:
+            tuple: (запись индекса, способ сохранения или None если копия уже была)
+                   способ "dedup" означает, что такое содержимое уже хранилось
+        """
+        stat = os.stat(path)
+        record = self.lookup(path, stat)
+        if record is not None:
+            return record, None
+
+        digest = _file_sha256(path)
+        stored = self.objects.get(digest)
+        if stored is not None:
+            strategy = "dedup"
+        else:
+            stored, strategy = self._store_object(path, digest)
+
+        record = {
+            "path": self._key(path),
+            "name": os.path.basename(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "object": digest,
+            "stored": stored,
+        }
+        self._append_index(record)
+        return record, strategy
+
+    def find(self, name_or_path):
+        """
+        Находит запись по исходному пути или имени файла.
+
+        При нескольких файлах с одним именем возвращается последний сохраненный.
+        """
+        record = self.files.get(self._key(name_or_path))
+        if record is not None:
+            return record
+        matches = [r for r in self.files.values() if r["name"] == os.path.basename(name_or_path)]
+        return matches[-1] if matches else None
+
+    def restore(self, record, target):
+        """
+        Восстанавливает файл из хранилища с исходным временем изменения.
+
+        Args:
+            record (dict): Запись индекса
+            target (str): Путь восстановленного файла
+        """
+        source = os.path.join(self.root, record["stored"])
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            if source.endswith(".gz"):
+                decompressor = zlib.decompressobj(31)
+                with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+                    for block in iter(lambda: src.read(_BLOCK_SIZE), b""):
+                        dst.write(decompressor.decompress(block))
+                    dst.write(decompressor.flush())
+            else:
+                shutil.copyfile(source, tmp_path)
+            os.utime(tmp_path, ns=(record["mtime_ns"], record["mtime_ns"]))
+            os.replace(tmp_path, target)
+        except BaseException:
+            _remove_partial(tmp_path)
+            raise
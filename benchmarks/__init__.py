@@ -0,0 +1,6 @@
+"""
+Бенчмарки скрипта рандомизации.
+
+Генератор синтетического корпуса .xlsx файлов (corpus.py) и замер времени
+отдельных этапов обработки (stages.py). Запуск: python -m benchmarks --help
+"""
@@ -0,0 +1,84 @@
+"""
+Запуск бенчмарка: python -m benchmarks [параметры]
+
+Создает синтетический корпус (или использует готовый через --corpus),
+замеряет этапы обработки и выводит JSON отчет.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.stages import run_benchmark
+from benchmarks.startup import run_startup_benchmark
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Бенчмарк обработки Excel файлов")
+    parser.add_argument("--files", type=int, default=10, help="количество файлов корпуса")
+    parser.add_argument("--rows", type=int, default=1000, help="строк на листе")
+    parser.add_argument("--columns", type=int, default=20, help="столбцов на листе")
+    parser.add_argument("--sheets", type=int, default=1, help="листов в книге")
+    parser.add_argument("--string-ratio", type=float, default=0.1, help="доля текстовых ячеек")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора корпуса")
+    parser.add_argument("--engine", default="pandas", help="движок для замера полной обработки")
+    parser.add_argument("--corpus", help="каталог готового корпуса (без генерации)")
+    parser.add_argument("--output", help="файл для JSON отчета (по умолчанию stdout)")
+    parser.add_argument("--startup-only", action="store_true", help="замерить только время запуска")
+    parser.add_argument("--max-import-ms", type=float,
+                        help="порог времени импорта: код возврата 1 при превышении или загрузке тяжелых библиотек")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    startup = run_startup_benchmark()
+
+    if args.startup_only:
+        report = {"startup": startup}
+    else:
+        report = _run_corpus_benchmark(args)
+        report["startup"] = startup
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+    if args.max_import_ms is not None:
+        if startup["heavy_modules"]:
+            sys.stderr.write(f"При импорте загружаются тяжелые библиотеки: {startup['heavy_modules']}\n")
+            return 1
+        if startup["import_ms"] is None or startup["import_ms"] > args.max_import_ms:
+            sys.stderr.write(f"Время импорта {startup['import_ms']} мс превышает {args.max_import_ms} мс\n")
+            return 1
+    return 0
+
+
+def _run_corpus_benchmark(args):
+    with tempfile.TemporaryDirectory(prefix="rev-bench-") as work_dir:
+        corpus_dir = args.corpus
+        params = None
+        if corpus_dir is None:
+            corpus_dir = f"{work_dir}/corpus"
+            params = {
+                "files": args.files,
+                "rows": args.rows,
+                "columns": args.columns,
+                "sheets": args.sheets,
+                "string_ratio": args.string_ratio,
+                "seed": args.seed,
+            }
+            generate_corpus(corpus_dir, **params)
+
+        report = run_benchmark(corpus_dir, work_dir, engine=args.engine)
+        report["corpus"] = params or {"path": corpus_dir}
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Генератор синтетического корпуса Excel файлов с целевыми столбцами.
+"""
+
+import os
+import random
+
+from openpyxl import Workbook
+
+import randomize_excel_values as rev
+
+
+def _headers(columns):
+    """Заголовки: целевые столбцы, дополненные служебными до нужного количества."""
+    headers = list(rev.TARGET_COLUMNS[:columns])
+    for i in range(len(headers), columns):
+        headers.append(f"Параметр {i + 1}")
+    return headers
+
+
+def generate_workbook(path, rows=1000, columns=20, sheets=1, string_ratio=0.1, rng=None):
+    """
+    Создает одну книгу с заданным количеством строк, столбцов и листов.
+
+    Args:
+        path (str): Путь к создаваемому файлу
+        rows (int): Количество строк данных на листе
+        columns (int): Количество столбцов (первые - из TARGET_COLUMNS)
+        sheets (int): Количество листов
+        string_ratio (float): Доля текстовых ячеек среди значений
+        rng (random.Random): Генератор случайных чисел
+    """
+    rng = rng or random.Random()
+    workbook = Workbook(write_only=True)
+    headers = _headers(columns)
+
+    for sheet_number in range(1, sheets + 1):
+        sheet = workbook.create_sheet(f"Стенд {sheet_number}")
+        sheet.append(headers)
+        for row_number in range(rows):
+            row = []
+            for _ in headers:
+                if rng.random() < string_ratio:
+                    row.append(rng.choice(("—", "н/д", "брак", "повтор")))
+                else:
+                    row.append(rng.uniform(18.0, 24.0))
+            sheet.append(row)
+
+    workbook.save(path)
+
+
+def generate_corpus(directory, files=10, rows=1000, columns=20, sheets=1, string_ratio=0.1, seed=0):
+    """
+    Создает корпус книг в каталоге.
+
+    Args:
+        directory (str): Каталог корпуса
+        files (int): Количество файлов
+        rows, columns, sheets, string_ratio: Параметры каждой книги (см. generate_workbook)
+        seed (int): Зерно генератора для воспроизводимого корпуса
+
+    Returns:
+        list: Пути к созданным файлам
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"bench_{i:05d}.xlsx")
+        generate_workbook(path, rows, columns, sheets, string_ratio, rng)
+        paths.append(path)
+    return paths
@@ -0,0 +1,116 @@
+"""
+Замер времени этапов обработки на корпусе файлов.
+
+Этапы берутся из замеров (instrumentation.span) внутри process_excel_file:
+поиск файлов, резервное копирование, чтение, поиск столбцов, генерация
+значений, запись и сохранение временных меток движка pandas. Дополнительно
+замеряется полная обработка выбранным движком.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import shutil
+import time
+
+import instrumentation
+import randomize_excel_values as rev
+from instrumentation import span
+
+STAGES = ("discovery", "backup", "read", "resolve", "generate", "write", "timestamps")
+
+
+def _configure(work_dir, engine):
+    """
+    Направляет результаты и резервные копии во временный каталог бенчмарка.
+
+    Каталоги очищаются, а кеши модуля сбрасываются, чтобы второй проход не
+    пропускал резервное копирование по индексу хранилища первого прохода и
+    не получал найденные столбцы из кеша заголовков.
+    """
+    rev.OUTPUT_DIR = os.path.join(work_dir, "output")
+    rev.BACKUP_DIR = os.path.join(work_dir, "backup")
+    rev.ENGINE = engine
+    for directory in (rev.OUTPUT_DIR, rev.BACKUP_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    rev._backup_stores.clear()
+    rev._header_cache = rev.HeaderCache()
+
+
+def _count_rows(files):
+    """Количество строк данных на всех обрабатываемых листах (SHEET_PATTERN) файлов."""
+    from openpyxl import load_workbook
+
+    rows = 0
+    for file_path in files:
+        workbook = load_workbook(file_path, read_only=True)
+        for worksheet in workbook.worksheets:
+            if rev.sheet_selected(worksheet.title):
+                rows += sum(1 for _ in worksheet.iter_rows(min_row=2, values_only=True))
+        workbook.close()
+    return rows
+
+
+def _rate(count, seconds):
+    return round(count / seconds, 3) if seconds > 0 else None
+
+
+def run_benchmark(corpus_dir, work_dir, engine="pandas"):
+    """
+    Замеряет этапы обработки всех файлов корпуса.
+
+    Args:
+        corpus_dir (str): Каталог с .xlsx файлами
+        work_dir (str): Каталог для результатов и резервных копий
+        engine (str): Движок для замера полной обработки
+
+    Returns:
+        dict: Отчет с временем, строками/с и файлами/с по этапам
+    """
+    _configure(work_dir, "pandas")
+    instrumentation.reset()
+    instrumentation.enable(instrumentation.MemorySink())
+    try:
+        with span("discovery"):
+            files = sorted(glob.glob(os.path.join(corpus_dir, "*.xlsx")))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for file_path in files:
+                rev.process_excel_file(file_path)
+        stages = instrumentation.summary()
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+    _configure(work_dir, engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        processed = sum(1 for file_path in files if rev.process_excel_file(file_path))
+        end_to_end = time.perf_counter() - start
+
+    rows = _count_rows(files)
+    report = {
+        "engine": engine,
+        "files": len(files),
+        "rows": rows,
+        "input_bytes": sum(os.path.getsize(path) for path in files),
+        "stages": {},
+        "end_to_end": {
+            "seconds": round(end_to_end, 6),
+            "processed": processed,
+            "rows_per_s": _rate(rows, end_to_end),
+            "files_per_s": _rate(len(files), end_to_end),
+        },
+    }
+    for stage in STAGES:
+        item = stages.get(stage, {"total": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0})
+        report["stages"][stage] = {
+            "seconds": round(item["total"], 6),
+            "p50": round(item["p50"], 6),
+            "p95": round(item["p95"], 6),
+            "max": round(item["max"], 6),
+            "rows_per_s": _rate(rows, item["total"]),
+            "files_per_s": _rate(len(files), item["total"]),
+        }
+    return report
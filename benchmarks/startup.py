@@ -0,0 +1,88 @@
+"""
+Замер времени запуска скрипта.
+
+Время импорта модуля берется из python -X importtime, дополнительно проверяется,
+что при импорте не загружаются тяжелые библиотеки, и замеряется полное время
+выполнения randomize_excel_values.py --help.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import randomize_excel_values as rev
+
+# Библиотеки, которые должны загружаться только при обработке файлов
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl")
+
+_ROOT = os.path.dirname(os.path.abspath(rev.__file__))
+
+
+def _parse_importtime(stderr, module):
+    """
+    Разбирает вывод -X importtime.
+
+    Returns:
+        tuple: (суммарное время импорта модуля в мкс, множество импортированных пакетов)
+    """
+    cumulative = None
+    imported = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|", 2)
+        name = name.strip()
+        if not total.strip().isdigit():
+            continue  # строка заголовков
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(total)
+    return cumulative, imported
+
+
+def measure_import(module="randomize_excel_values", repeat=5):
+    """
+    Замеряет время импорта модуля в отдельном процессе.
+
+    Returns:
+        dict: Минимальное время импорта (мс) и загруженные тяжелые библиотеки
+    """
+    times = []
+    heavy = set()
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=_ROOT, capture_output=True, text=True, check=True,
+        )
+        cumulative, imported = _parse_importtime(result.stderr, module)
+        if cumulative is not None:
+            times.append(cumulative / 1000)
+        heavy |= imported.intersection(HEAVY_MODULES)
+    return {
+        "import_ms": round(min(times), 3) if times else None,
+        "heavy_modules": sorted(heavy),
+    }
+
+
+def measure_help(repeat=5):
+    """Замеряет полное время выполнения randomize_excel_values.py --help (мс, минимум)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(_ROOT, "randomize_excel_values.py"), "--help"],
+            cwd=_ROOT, capture_output=True, check=True,
+        )
+        times.append((time.perf_counter() - start) * 1000)
+    return round(min(times), 3)
+
+
+def run_startup_benchmark(repeat=5):
+    """
+    Returns:
+        dict: {"import_ms", "heavy_modules", "help_ms"}
+    """
+    report = measure_import(repeat=repeat)
+    report["help_ms"] = measure_help(repeat=repeat)
+    return report
@@ -0,0 +1,201 @@
+"""
+Статистика значений по корпусу файлов за один проход.
+
+Накопители объединяемы: каждый рабочий процесс считает свои частичные
+накопители, родительский процесс объединяет их. Значения в памяти не хранятся:
+  RunningStats   - количество, min, max, среднее и дисперсия (алгоритм Уэлфорда,
+                   объединение по формулам Чана)
+  QuantileSketch - приближенные квантили с ограниченной относительной ошибкой
+                   (логарифмические корзины, как в DDSketch)
+"""
+
+import math
+
+
+class RunningStats:
+    """Количество, минимум, максимум, среднее и дисперсия за один проход."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Добавляет значение (алгоритм Уэлфорда)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Добавляет накопитель, посчитанный по другой части данных (формулы Чана)."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Выборочная дисперсия (None, если значений меньше двух)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self):
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        stats.min, stats.max = data["min"], data["max"]
+        return stats
+
+
+class QuantileSketch:
+    """
+    Приближенные квантили с относительной ошибкой не больше relative_accuracy.
+
+    Значение x > 0 попадает в корзину ceil(log(x) / log(gamma)), где
+    gamma = (1 + a) / (1 - a); отрицательные значения хранятся отдельно по модулю.
+    Число корзин растет логарифмически от отношения наибольшего значения к наименьшему.
+
+    Args:
+        relative_accuracy (float): Допустимая относительная ошибка квантилей
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        # Середина корзины (gamma^(i-1), gamma^i] с относительной ошибкой не больше a
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value):
+        """Добавляет значение."""
+        self.count += 1
+        if value > 0:
+            index = self._index(value)
+            self.positive[index] = self.positive.get(index, 0) + 1
+        elif value < 0:
+            index = self._index(-value)
+            self.negative[index] = self.negative.get(index, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other):
+        """Добавляет набросок, посчитанный по другой части данных с той же точностью."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Объединяются наброски с разной точностью")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in other_store.items():
+                store[index] = store.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def _ordered(self):
+        """Корзины в порядке возрастания значений: (значение, количество)."""
+        for index in sorted(self.negative, reverse=True):
+            yield -self._value(index), self.negative[index]
+        if self.zeros:
+            yield 0.0, self.zeros
+        for index in sorted(self.positive):
+            yield self._value(index), self.positive[index]
+
+    def quantile(self, q):
+        """Возвращает приближенный квантиль q (0..1) или None для пустого наброска."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in self._ordered():
+            seen += count
+            if seen > rank:
+                return value
+        return value
+
+    def fraction_below(self, value):
+        """Приближенная доля значений меньше value."""
+        if not self.count:
+            return None
+        below = sum(count for bucket, count in self._ordered() if bucket < value)
+        return below / self.count
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(index): count for index, count in self.positive.items()},
+            "negative": {str(index): count for index, count in self.negative.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        sketch.positive = {int(index): count for index, count in data["positive"].items()}
+        sketch.negative = {int(index): count for index, count in data["negative"].items()}
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        return sketch
+
+
+class ColumnStats:
+    """Накопители одного столбца: RunningStats и QuantileSketch."""
+
+    def __init__(self, relative_accuracy=0.001):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def quantile(self, q):
+        """Приближенный квантиль, ограниченный точными min и max."""
+        value = self.sketch.quantile(q)
+        if value is None:
+            return None
+        return min(max(value, self.stats.min), self.stats.max)
+
+    def to_dict(self):
+        return {"stats": self.stats.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        column = cls(data["sketch"]["relative_accuracy"])
+        column.stats = RunningStats.from_dict(data["stats"])
+        column.sketch = QuantileSketch.from_dict(data["sketch"])
+        return column
@@ -0,0 +1,183 @@
+"""
+Замер времени этапов обработки именованными интервалами (spans).
+
+Пока замер не включен, span() возвращает общий пустой контекстный менеджер,
+поэтому накладные расходы сводятся к одному вызову функции.
+Включенный замер собирает длительности по именам для итоговой сводки
+и передает каждую запись в приемник (sink): файл JSON lines или список в памяти.
+"""
+
+import json
+import math
+import os
+import time
+
+
+class MemorySink:
+    """Приемник, сохраняющий записи в списке (для тестов и бенчмарков)."""
+
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """
+    Приемник, дописывающий записи в файл JSON lines.
+
+    Каждая запись пишется одним вызовом write в режиме дозаписи, поэтому
+    в один файл могут одновременно писать несколько процессов.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def emit(self, record):
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_enabled = False
+_sink = None
+_durations = {}
+
+
+class _Span:
+    __slots__ = ("name", "fields", "start")
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _durations.setdefault(self.name, []).append(seconds)
+        if _sink is not None:
+            record = {"span": self.name, "seconds": seconds, "ok": exc_type is None,
+                      "pid": os.getpid(), "time": time.time()}
+            record.update(self.fields)
+            _sink.emit(record)
+        return False
+
+
+def span(name, **fields):
+    """
+    Возвращает контекстный менеджер, замеряющий длительность этапа.
+
+    Args:
+        name (str): Имя этапа
+        **fields: Дополнительные поля записи (например, file)
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, fields)
+
+
+def enable(sink=None):
+    """Включает замер; sink - необязательный приемник записей (заменяет прежний)."""
+    global _enabled, _sink
+    if _sink is not None and _sink is not sink:
+        _sink.close()
+    _enabled = True
+    _sink = sink
+
+
+def disable():
+    """Выключает замер и закрывает приемник."""
+    global _enabled, _sink
+    if _sink is not None:
+        _sink.close()
+    _enabled = False
+    _sink = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Очищает собранные длительности."""
+    _durations.clear()
+
+
+def drain():
+    """
+    Возвращает собранные длительности и очищает их.
+
+    Returns:
+        dict: {имя этапа: [длительности в секундах]}
+    """
+    collected = {name: list(values) for name, values in _durations.items()}
+    _durations.clear()
+    return collected
+
+
+def merge(durations):
+    """Добавляет длительности, собранные в другом процессе (результат drain)."""
+    for name, values in durations.items():
+        _durations.setdefault(name, []).extend(values)
+
+
+def _percentile(sorted_values, fraction):
+    """Перцентиль методом ближайшего ранга."""
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summary(durations=None):
+    """
+    Сводка по этапам.
+
+    Returns:
+        dict: {имя этапа: {"count", "total", "p50", "p95", "max"}}
+    """
+    durations = _durations if durations is None else durations
+    result = {}
+    for name, values in durations.items():
+        if not values:
+            continue
+        ordered = sorted(values)
+        result[name] = {
+            "count": len(ordered),
+            "total": sum(ordered),
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "max": ordered[-1],
+        }
+    return result
+
+
+def print_summary(durations=None):
+    """Выводит таблицу p50/p95/max по этапам."""
+    stats = summary(durations)
+    if not stats:
+        return
+    print("\n⏱️  Время этапов (сек):")
+    print(f"  {'этап':<16}{'кол-во':>8}{'всего':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for name, item in sorted(stats.items(), key=lambda pair: -pair[1]["total"]):
+        print(f"  {name:<16}{item['count']:>8}{item['total']:>10.3f}"
+              f"{item['p50']:>10.4f}{item['p95']:>10.4f}{item['max']:>10.4f}")
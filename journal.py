@@ -0,0 +1,126 @@
+"""
+Журнал массовой обработки для продолжения после сбоя.
+
+Журнал хранится в SQLite (режим WAL): для каждого пакета записывается список
+файлов и состояние каждого файла - pending, in_progress, done или failed.
+Файлы, оставшиеся в состоянии in_progress после сбоя, могли быть записаны
+не полностью и обрабатываются заново.
+"""
+
+import sqlite3
+import time
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    settings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    output TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (batch_id, path)
+);
+"""
+
+
+class BatchJournal:
+    """
+    Журнал пакетов обработки.
+
+    Args:
+        path (str): Путь к файлу базы SQLite
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL synchronous=NORMAL сохраняет целостность при сбое процесса
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def unfinished_batch(self):
+        """
+        Возвращает последний незавершенный пакет.
+
+        Returns:
+            dict или None: {"id", "started", "settings", "remaining"}
+        """
+        row = self._db.execute(
+            "SELECT id, started, settings FROM batches WHERE finished IS NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = self._db.execute(
+            "SELECT COUNT(*) FROM entries WHERE batch_id = ? AND state IN (?, ?)",
+            (row[0], PENDING, IN_PROGRESS),
+        ).fetchone()[0]
+        return {"id": row[0], "started": row[1], "settings": row[2], "remaining": remaining}
+
+    def start_batch(self, files, settings):
+        """
+        Создает пакет со всеми файлами в состоянии pending.
+
+        Незавершенные ранее пакеты закрываются: новый пакет их заменяет.
+
+        Returns:
+            int: Номер пакета
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute("UPDATE batches SET finished = ? WHERE finished IS NULL", (now,))
+            batch_id = self._db.execute(
+                "INSERT INTO batches (started, settings) VALUES (?, ?)", (now, settings)
+            ).lastrowid
+            self._db.executemany(
+                "INSERT OR IGNORE INTO entries (batch_id, path, state, updated) VALUES (?, ?, ?, ?)",
+                [(batch_id, path, PENDING, now) for path in files],
+            )
+        return batch_id
+
+    def remaining(self, batch_id):
+        """
+        Возвращает необработанные файлы пакета.
+
+        Returns:
+            tuple: (файлы в состоянии pending, файлы, прерванные в состоянии in_progress
+                    вместе с путем результата)
+        """
+        pending = [row[0] for row in self._db.execute(
+            "SELECT path FROM entries WHERE batch_id = ? AND state = ? ORDER BY rowid",
+            (batch_id, PENDING),
+        )]
+        interrupted = self._db.execute(
+            "SELECT path, output FROM entries WHERE batch_id = ? AND state = ? ORDER BY rowid",
+            (batch_id, IN_PROGRESS),
+        ).fetchall()
+        return pending, interrupted
+
+    def mark(self, batch_id, path, state, output=None, error=None):
+        """Записывает новое состояние файла."""
+        with self._db:
+            self._db.execute(
+                "UPDATE entries SET state = ?, output = COALESCE(?, output), error = ?, updated = ? "
+                "WHERE batch_id = ? AND path = ?",
+                (state, output, error, time.time(), batch_id, path),
+            )
+
+    def finish_batch(self, batch_id):
+        """Отмечает пакет завершенным."""
+        with self._db:
+            self._db.execute("UPDATE batches SET finished = ? WHERE id = ?", (time.time(), batch_id))
+
+    def close(self):
+        self._db.close()
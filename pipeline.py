@@ -0,0 +1,102 @@
+"""
+Конвейерная обработка: этапы (чтение, преобразование, запись) выполняются
+в отдельных потоках и перекрываются во времени - пока один файл
+записывается, следующий уже читается.
+
+Память ограничивается общим бюджетом конвейера: в работе одновременно
+находится не больше max_items элементов и не больше max_bytes байт
+(по размеру, который сообщает функция size). Элемент занимает бюджет от
+поступления на первый этап до выдачи результата.
+"""
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class _Failed:
+    """Ошибка этапа, передаваемая по конвейеру до выдачи результата."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _stage_worker(function, inbox, outbox):
+    while True:
+        task = inbox.get()
+        if task is _STOP:
+            return
+        item, item_size, value = task
+        if not isinstance(value, _Failed):
+            try:
+                value = function(item, value)
+            except Exception as e:
+                value = _Failed(e)
+        outbox.put((item, item_size, value))
+
+
+def run_pipeline(items, stages, max_items=2, max_bytes=None, size=None, on_start=None):
+    """
+    Пропускает элементы через этапы конвейера и выдает результаты по готовности.
+
+    Подача элементов, вызов on_start и выдача результатов выполняются в вызывающем
+    потоке, поэтому on_start и обработка результатов могут использовать объекты,
+    привязанные к этому потоку (например, соединение SQLite).
+
+    Args:
+        items (iterable): Элементы (например, пути к файлам)
+        stages (list): Пары (функция, количество потоков); функция получает элемент
+                       и результат предыдущего этапа (None для первого) и возвращает
+                       результат этапа
+        max_items (int): Наибольшее число элементов в работе
+        max_bytes (int): Наибольший суммарный размер элементов в работе (None - без ограничения)
+        size (callable): Размер элемента в байтах (по умолчанию 0)
+        on_start (callable): Вызывается для элемента перед подачей в конвейер
+
+    Yields:
+        tuple: (элемент, результат последнего этапа, исключение или None)
+    """
+    size = size or (lambda item: 0)
+    max_items = max(1, max_items)
+    queues = [queue.Queue() for _ in range(len(stages) + 1)]
+    threads = []
+    for (function, count), inbox, outbox in zip(stages, queues, queues[1:]):
+        for _ in range(max(1, count)):
+            thread = threading.Thread(target=_stage_worker, args=(function, inbox, outbox), daemon=True)
+            thread.start()
+            threads.append((thread, inbox))
+
+    pending = iter(items)
+    next_item = next(pending, _STOP)
+    in_flight = 0
+    in_flight_bytes = 0
+    try:
+        while next_item is not _STOP or in_flight:
+            # Подаем элементы, пока позволяет бюджет; один элемент подается всегда,
+            # даже если он сам больше max_bytes
+            while next_item is not _STOP and in_flight < max_items:
+                item_size = size(next_item)
+                if in_flight and max_bytes is not None and in_flight_bytes + item_size > max_bytes:
+                    break
+                if on_start is not None:
+                    on_start(next_item)
+                in_flight += 1
+                in_flight_bytes += item_size
+                queues[0].put((next_item, item_size, None))
+                next_item = next(pending, _STOP)
+
+            item, item_size, value = queues[-1].get()
+            in_flight -= 1
+            in_flight_bytes -= item_size
+            if isinstance(value, _Failed):
+                yield item, None, value.error
+            else:
+                yield item, value, None
+    finally:
+        for thread, inbox in threads:
+            inbox.put(_STOP)
+        for thread, _ in threads:
+            thread.join(timeout=1)
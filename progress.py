@@ -0,0 +1,137 @@
+"""
+Отображение хода массовой обработки: скорость (файлы, строки, байты в секунду)
+и оценка оставшегося времени по объему еще не обработанных файлов.
+
+В терминале строка хода обработки закреплена в последней строке экрана
+(остальной вывод, в том числе рабочих процессов, прокручивается выше нее) и
+обновляется не чаще MIN_REDRAW_INTERVAL. Если вывод перенаправлен в файл или
+канал, раз в log_interval секунд пишется обычная строка журнала.
+"""
+
+import shutil
+import sys
+import time
+
+# Минимальный интервал перерисовки строки в терминале (сек)
+MIN_REDRAW_INTERVAL = 0.2
+
+
+def format_bytes(value):
+    """Форматирует размер в байтах: 512 Б, 1.5 МБ и т.д."""
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if abs(value) < 1024 or unit == "ГБ":
+            return f"{value:.0f} {unit}" if unit == "Б" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_duration(seconds):
+    """Форматирует длительность: 42 с, 3 мин 05 с, 1 ч 02 мин."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} с"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} мин {seconds:02d} с"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ч {minutes:02d} мин"
+
+
+class ProgressReporter:
+    """
+    Ход обработки пакета файлов.
+
+    Родительский процесс вызывает advance() по завершении каждого файла,
+    поэтому учет одинаково работает при последовательной и параллельной обработке.
+
+    Args:
+        total_files (int): Количество файлов в пакете
+        total_bytes (int): Суммарный размер файлов
+        stream: Поток вывода (по умолчанию sys.stdout)
+        log_interval (float): Период строк журнала, если вывод не в терминал (сек)
+    """
+
+    def __init__(self, total_files, total_bytes, stream=None, log_interval=10.0):
+        self.stream = stream or sys.stdout
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.log_interval = log_interval
+        self.files = 0
+        self.failed = 0
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._last_output = 0.0
+        self._rows_on_screen = None
+
+        isatty = getattr(self.stream, "isatty", None)
+        if isatty is not None and isatty():
+            rows = shutil.get_terminal_size(fallback=(80, 0)).lines
+            if rows >= 3:
+                self._rows_on_screen = rows
+                # Освобождаем последнюю строку экрана и ограничиваем область прокрутки
+                # строками выше нее (установка области переносит курсор, поэтому он сохраняется)
+                self._write(f"\n\x1b[1A\x1b7\x1b[1;{rows - 1}r\x1b8")
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def advance(self, size=0, rows=0, ok=True):
+        """
+        Учитывает обработанный файл.
+
+        Args:
+            size (int): Размер файла в байтах
+            rows (int): Количество строк данных (если известно)
+            ok (bool): Файл обработан успешно
+        """
+        self.files += 1
+        self.failed += 0 if ok else 1
+        self.rows += rows or 0
+        self.bytes += size
+        self._maybe_render(final=self.files >= self.total_files)
+
+    def _maybe_render(self, final=False):
+        now = time.monotonic()
+        interval = MIN_REDRAW_INTERVAL if self._rows_on_screen else self.log_interval
+        if not final and now - self._last_output < interval:
+            return
+        self._last_output = now
+        self.render()
+
+    def line(self):
+        """Возвращает текст строки хода обработки."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        percent = 100.0 * self.bytes / self.total_bytes if self.total_bytes else 100.0
+        text = (f"⏳ {self.files}/{self.total_files} файлов ({percent:.0f}%) | "
+                f"{self.files / elapsed:.2f} файл/с, {self.rows / elapsed:.0f} строк/с, "
+                f"{format_bytes(self.bytes / elapsed)}/с")
+        if self.failed:
+            text += f" | ошибок: {self.failed}"
+
+        remaining = self.total_bytes - self.bytes
+        if self.files >= self.total_files:
+            text += f" | готово за {format_duration(elapsed)}"
+        elif self.bytes and remaining > 0:
+            text += f" | осталось ~{format_duration(remaining * elapsed / self.bytes)}"
+        return text
+
+    def render(self):
+        """Выводит строку хода обработки."""
+        if self._rows_on_screen:
+            width = shutil.get_terminal_size().columns
+            # Сохранение курсора, последняя строка экрана, очистка строки, возврат курсора
+            self._write(f"\x1b7\x1b[{self._rows_on_screen};1H\x1b[2K{self.line()[:width - 1]}\x1b8")
+        else:
+            self._write(self.line() + "\n")
+
+    def close(self):
+        """Восстанавливает терминал и выводит итоговую строку."""
+        if self._rows_on_screen:
+            rows = self._rows_on_screen
+            self._rows_on_screen = None
+            self._write(f"\x1b7\x1b[{rows};1H\x1b[2K\x1b[r\x1b8")
+            self._write(self.line() + "\n")
+        elif self._last_output == 0.0 or self.files < self.total_files:
+            # Итоговая строка, если последнее состояние еще не было выведено
+            self.render()
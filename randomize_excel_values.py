@@ -5,14 +5,22 @@
 Диапазон значений: от 20.9 до 22.1 с высокой точностью (до 13 знаков после запятой)
 """
 
-import pandas as pd
-import numpy as np
 import os
+import fnmatch
 import glob
-import random
-import shutil
+import hashlib
+import json
+import math
+import re
+import sys
 from pathlib import Path
 
+import backup_store
+import instrumentation
+import journal
+import progress
+from instrumentation import span
+
 # Настройки
 INPUT_DIR = "src/xlsx"  # Папка с исходными файлами
 OUTPUT_DIR = "output"   # Папка для сохранения обработанных файлов
@@ -42,12 +50,226 @@ MAX_VALUE = 22.1
 
 # Опция сохранения временных меток файлов
 PRESERVE_FILE_DATES = True  # Сохранять дату создания/изменения файлов
-def generate_random_value(min_val=MIN_VALUE, max_val=MAX_VALUE):
+
+# Движок обработки файлов:
+#   "pandas" - чтение всей таблицы в DataFrame (по умолчанию)
+#   "stream" - построчная потоковая обработка openpyxl, память ограничена одной строкой
+#   "patch"  - замена значений прямо в XML листа, остальная книга (стили, листы,
+#              ширина столбцов) копируется без изменений
+ENGINE = "pandas"
+ENGINES = ("pandas", "stream", "patch")
+
+# Обрабатываемые листы: шаблон имени ("*" - все листы, "Стенд*" - листы стендов).
+# Книга разбирается один раз, результат содержит все листы, неподходящие листы не изменяются
+SHEET_PATTERN = "*"
+
+# Размер блока значений, генерируемых за один вызов в потоковом режиме
+STREAM_CHUNK_SIZE = 65536
+
+# Количество параллельных процессов для массовой обработки (1 - последовательно)
+WORKERS = 1
+
+# Быстрый анализ: читаются заголовки и первые ANALYZE_SAMPLE_ROWS строк каждого листа,
+# файлы анализируются в ANALYZE_WORKERS процессах (None - по числу процессоров)
+ANALYZE_SAMPLE_ROWS = 100
+ANALYZE_WORKERS = None
+
+# Статистика по корпусу (команда stats): относительная точность квантилей и
+# выводимые квантили
+STATS_RELATIVE_ACCURACY = 0.001
+STATS_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Конвейерная обработка (движок "pandas", WORKERS = 1): чтение следующих файлов
+# (PIPELINE_READERS процессов), рандомизация и запись (PIPELINE_WRITERS процессов)
+# выполняются одновременно.
+# В работе не больше PIPELINE_MAX_WORKBOOKS книг и не больше PIPELINE_MAX_MB
+# мегабайт исходных файлов (None - без ограничения по объему)
+PIPELINE = False
+PIPELINE_READERS = 1
+PIPELINE_WRITERS = 1
+PIPELINE_MAX_WORKBOOKS = 3
+PIPELINE_MAX_MB = None
+
+# Резервные копии хранятся в BACKUP_DIR по хешу содержимого (см. backup_store.py).
+# Сжатие (--backup-compress) почти не уменьшает .xlsx (он уже сжат deflate), но требует
+# полного чтения и сжатия файла, поэтому по умолчанию объекты хранятся без сжатия
+BACKUP_COMPRESS = False
+# Стратегия создания несжатых резервных копий: "auto" (reflink, затем копирование
+# в ядре, затем обычное), "reflink", "copy_file_range", "copy" или "hardlink" -
+# только если исходные файлы никогда не перезаписываются на месте (см. backup_store.py)
+BACKUP_STRATEGY = "auto"
+
+# Манифест обработанных файлов (в OUTPUT_DIR): неизмененные файлы с готовым
+# результатом при массовой обработке пропускаются
+MANIFEST_FILE = ".manifest.json"
+FORCE_REPROCESS = False  # Обрабатывать все файлы, игнорируя манифест (--force)
+
+# Результат записывается во временный файл в OUTPUT_DIR и переименовывается
+# на место только после успешной записи. Сброс результатов на диск (fsync):
+#   "never" - не вызывать, данные записывает на диск ОС
+#   "file"  - fsync каждого файла перед переименованием (надежно, но медленно на мелких файлах)
+#   "batch" - fsync записанных результатов и OUTPUT_DIR один раз после массовой
+#             обработки или обработки файла
+FSYNC_MODE = "batch"
+FSYNC_MODES = ("never", "file", "batch")
+
+# Журнал массовой обработки (в OUTPUT_DIR): позволяет продолжить прерванный пакет (--resume)
+JOURNAL_FILE = ".journal.sqlite"
+
+# Оценка времени обработки файла без истории прошлых запусков (сек на МБ файла).
+# С историей скорость определяется по манифесту; при параллельной обработке
+# файлы запускаются в порядке убывания оценки (сначала самые долгие)
+COST_SECONDS_PER_MB = 1.0
+# Сколько строк выводить в отчете "оценка/факт" после массовой обработки
+SCHEDULE_REPORT_LIMIT = 10
+
+# Строка хода обработки (скорость и оставшееся время) при массовой обработке.
+# Если вывод не в терминал, строка пишется раз в PROGRESS_LOG_INTERVAL секунд
+PROGRESS = True
+PROGRESS_LOG_INTERVAL = 10.0
+
+# Замер времени этапов обработки: сводка p50/p95/max в конце массовой обработки.
+# TIMINGS_FILE - необязательный файл JSON lines для записей по каждому этапу
+TIMINGS = False
+TIMINGS_FILE = None
+
+# Режим отслеживания INPUT_DIR: файл отдается на обработку, когда его размер и
+# время изменения не менялись WATCH_SETTLE_SECONDS; без inotify каталог
+# опрашивается каждые WATCH_POLL_INTERVAL секунд
+WATCH_SETTLE_SECONDS = 2.0
+WATCH_POLL_INTERVAL = 2.0
+
+# Точность генерируемых значений (знаков после запятой)
+VALUE_PRECISION = 13
+
+# Начальное значение генератора случайных чисел (--seed). Если задано, каждый столбец
+# каждого листа получает свой поток значений, определяемый SEED, именем файла, листом и
+# столбцом: результат повторяется при любом числе процессов и порядке обработки.
+# None - новые случайные значения при каждом запуске
+SEED = None
+
+# Генератор случайных чисел для пакетной генерации значений (создается при первом вызове)
+_RNG = None
+
+# Количество строк данных в обработанных файлах {путь: строки} для модели стоимости
+_row_counts = {}
+
+# Версии входных файлов, прочитанные при обработке {путь: запись хранилища резервных копий}
+_input_records = {}
+
+# Результаты, записанные после последнего сброса на диск (FSYNC_MODE = "batch")
+_unsynced_outputs = set()
+
+
+def generate_random_values(count, min_val=None, max_val=None, rng=None):
+    """
+    Генерирует массив случайных значений в заданном диапазоне одним вызовом numpy.
+    
+    Args:
+        count (int): Количество значений
+        min_val (float): Нижняя граница диапазона (по умолчанию MIN_VALUE)
+        max_val (float): Верхняя граница диапазона (по умолчанию MAX_VALUE)
+        rng (numpy.random.Generator): Генератор, по умолчанию общий для модуля
+    
+    Returns:
+        numpy.ndarray: Массив float64 длины count, округленный до VALUE_PRECISION знаков
+    """
+    import numpy as np
+    global _RNG
+    
+    if min_val is None:
+        min_val = MIN_VALUE
+    if max_val is None:
+        max_val = MAX_VALUE
+    if rng is None:
+        if _RNG is None:
+            _RNG = np.random.default_rng()
+        rng = _RNG
+    
+    values = rng.uniform(min_val, max_val, size=count)
+    return np.round(values, VALUE_PRECISION, out=values)
+
+def value_rng(file_path, sheet_name, column):
+    """
+    Создает генератор для столбца листа файла при заданном SEED.
+    
+    Ключ потока вычисляется из имени файла, имени листа и заголовка столбца,
+    поэтому поток не зависит от порядка обработки, числа процессов и папки файла.
+    
+    Returns:
+        numpy.random.Generator: Независимый воспроизводимый генератор
+    """
+    import numpy as np
+    
+    spawn_key = tuple(
+        int.from_bytes(hashlib.sha256(str(part).encode("utf-8")).digest()[:8], "little")
+        for part in (os.path.basename(file_path), sheet_name, column)
+    )
+    return np.random.default_rng(np.random.SeedSequence(SEED, spawn_key=spawn_key))
+
+def generate_random_value(min_val=None, max_val=None):
     """
     Генерирует случайное значение в заданном диапазоне с высокой точностью.
     Возвращает число с 13 знаками после запятой.
+    
+    Оставлена для совместимости: для столбцов используйте generate_random_values.
+    """
+    return float(generate_random_values(1, min_val, max_val)[0])
+
+class _ValueStream:
+    """
+    Поток случайных значений для построчной обработки.
+    
+    Значения генерируются блоками через generate_random_values, поэтому на каждую
+    ячейку не приходится отдельного вызова генератора. Размер блока растет вдвое
+    до STREAM_CHUNK_SIZE: для коротких столбцов не генерируется лишних значений.
+    Разбиение на блоки не меняет последовательность значений генератора.
+    """
+    
+    def __init__(self, chunk_size=None, rng=None):
+        self.chunk_size = chunk_size or STREAM_CHUNK_SIZE
+        self.rng = rng
+        self._next_size = min(1024, self.chunk_size)
+        self._buffer = []
+        self._position = 0
+    
+    def next(self):
+        """Возвращает следующее значение потока."""
+        if self._position >= len(self._buffer):
+            self._buffer = generate_random_values(self._next_size, rng=self.rng).tolist()
+            self._next_size = min(self._next_size * 2, self.chunk_size)
+            self._position = 0
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+
+def sheet_selected(name):
+    """Проверяет, что имя листа подходит под SHEET_PATTERN (без учета регистра)."""
+    return fnmatch.fnmatchcase(str(name).casefold(), SHEET_PATTERN.casefold())
+
+class _SheetValues:
+    """
+    Значения для ячеек файла при построчной обработке.
+    
+    Без SEED все столбцы берут значения из одного общего потока, с SEED у каждого
+    столбца каждого листа свой поток (см. value_rng), поэтому движки "stream" и
+    "patch" дают те же значения, что и "pandas".
     """
-    return round(random.uniform(min_val, max_val), 13)
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._shared = _ValueStream()
+        self._streams = {}
+    
+    def next(self, sheet_name, column):
+        """Возвращает следующее значение для столбца листа."""
+        if SEED is None:
+            return self._shared.next()
+        stream = self._streams.get((sheet_name, column))
+        if stream is None:
+            stream = _ValueStream(rng=value_rng(self.file_path, sheet_name, column))
+            self._streams[(sheet_name, column)] = stream
+        return stream.next()
 
 def create_directories():
     """Создает необходимые директории если они не существуют."""
@@ -55,16 +277,35 @@ def create_directories():
         Path(directory).mkdir(exist_ok=True)
         print(f"Создана/проверена директория: {directory}")
 
+_backup_stores = {}
+
+def get_backup_store():
+    """Возвращает хранилище резервных копий для текущих настроек."""
+    key = (BACKUP_DIR, BACKUP_COMPRESS, BACKUP_STRATEGY)
+    store = _backup_stores.get(key)
+    if store is None:
+        store = _backup_stores[key] = backup_store.BackupStore(
+            BACKUP_DIR, compress=BACKUP_COMPRESS, strategy=BACKUP_STRATEGY
+        )
+    return store
+
 def backup_file(file_path):
-    """Создает резервную копию файла."""
-    filename = os.path.basename(file_path)
-    backup_path = os.path.join(BACKUP_DIR, filename)
+    """
+    Создает резервную копию файла в хранилище с адресацией по содержимому.
+    
+    Returns:
+        dict: Запись индекса хранилища (размер, mtime_ns и хеш сохраненной версии)
+    """
+    record, strategy = get_backup_store().backup(file_path)
+    stored_path = os.path.join(BACKUP_DIR, record["stored"])
     
-    if not os.path.exists(backup_path):
-        shutil.copy2(file_path, backup_path)
-        print(f"Создана резервная копия: {backup_path}")
+    if strategy is None:
+        print(f"Резервная копия уже существует: {stored_path}")
+    elif strategy == "dedup":
+        print(f"Содержимое уже есть в хранилище, добавлена ссылка: {stored_path}")
     else:
-        print(f"Резервная копия уже существует: {backup_path}")
+        print(f"Создана резервная копия ({strategy}): {stored_path}")
+    return record
 
 def preserve_file_timestamps(source_file, target_file):
     """
@@ -86,197 +327,2119 @@ def preserve_file_timestamps(source_file, target_file):
     except Exception as e:
         print(f"  ⚠️  Не удалось сохранить временные метки: {str(e)}")
 
-def process_excel_file(file_path, test_mode=False):
+def temp_output_path(output_path):
+    """Возвращает путь временного файла рядом с результатом (с тем же расширением)."""
+    directory, name = os.path.split(output_path)
+    stem, extension = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.{os.getpid()}.tmp{extension}")
+
+def _fsync_directory(directory):
+    """Сбрасывает на диск запись каталога (переименование файла)."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def commit_output(source_file, tmp_path, output_path):
     """
-    Обрабатывает один Excel файл.
+    Переносит записанный временный файл на место результата.
+    
+    Временные метки переносятся до переименования, поэтому готовый результат
+    сразу появляется с метками исходного файла.
     
     Args:
-        file_path (str): Путь к файлу
-        test_mode (bool): Если True, выводит информацию о найденных столбцах без изменений
+        source_file (str): Путь к исходному файлу
+        tmp_path (str): Путь к записанному временному файлу
+        output_path (str): Путь результата
+    """
+    if PRESERVE_FILE_DATES:
+        with span("timestamps", file=source_file):
+            preserve_file_timestamps(source_file, tmp_path)
     
-    Returns:
-        bool: True если файл успешно обработан, False в случае ошибки
+    if FSYNC_MODE == "file":
+        with span("fsync", file=source_file):
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, output_path)
+            _fsync_directory(os.path.dirname(output_path))
+    else:
+        os.replace(tmp_path, output_path)
+        if FSYNC_MODE == "batch":
+            _unsynced_outputs.add(output_path)
+
+def sync_outputs():
+    """
+    Сбрасывает на диск результаты, записанные после прошлого вызова (FSYNC_MODE = "batch").
+    
+    Сбрасываются только эти файлы и их каталоги, а не все данные системы (os.sync),
+    поэтому запись других программ не задерживается.
     """
+    if FSYNC_MODE != "batch":
+        _unsynced_outputs.clear()
+        return
+    with span("fsync"):
+        directories = {OUTPUT_DIR}
+        while _unsynced_outputs:
+            output_path = _unsynced_outputs.pop()
+            try:
+                with open(output_path, "rb") as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                continue  # Результат удален или заменен после записи
+            directories.add(os.path.dirname(output_path))
+        for directory in directories:
+            _fsync_directory(directory)
+
+def _remove_temp(path):
     try:
-        print(f"\nОбработка файла: {file_path}")
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _normalize_header(name):
+    """Приводит заголовок к виду для сравнения: без пробелов, в нижнем регистре."""
+    return re.sub(r"\s+", "", str(name)).lower()
+
+class ColumnMatcher:
+    """
+    Скомпилированный поиск целевых столбцов среди заголовков.
+    
+    Правила применяются по порядку, каждый столбец сопоставляется не более одного раза:
+      "exact"      - заголовок совпадает с целевым столбцом
+      "normalized" - совпадение без учета пробелов и регистра (поиск по хеш-таблице)
+      "fuzzy"      - целевой столбец содержится в заголовке, но не как часть
+                     большего числа ("МЗ 1/60" не совпадает с "МЗ 1/600");
+                     применяется только для целевых столбцов без точного совпадения
+    """
+    
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self._order = {target: i for i, target in enumerate(self.targets)}
+        self._exact = set(self.targets)
+        self._normalized = {}
+        for target in self.targets:
+            self._normalized.setdefault(_normalize_header(target), target)
         
-        # Создаем резервную копию
-        if not test_mode:
-            backup_file(file_path)
+        # Длинные варианты проверяются первыми, чтобы выбрать наиболее точное совпадение
+        keys = sorted(self._normalized, key=len, reverse=True)
+        self._fuzzy = re.compile(
+            r"(?<![0-9])(" + "|".join(re.escape(key) for key in keys) + r")(?![0-9])"
+        ) if keys else None
+    
+    def match(self, columns):
+        """
+        Сопоставляет заголовки с целевыми столбцами.
         
-        # Читаем Excel файл
-        df = pd.read_excel(file_path)
+        Args:
+            columns (list): Заголовки столбцов
         
-        print(f"Размер таблицы: {df.shape[0]} строк, {df.shape[1]} столбцов")
-        print(f"Столбцы в файле: {list(df.columns)}")
+        Returns:
+            list: Кортежи (заголовок, целевой столбец, правило) в порядке TARGET_COLUMNS,
+                  затем в порядке столбцов в файле
+        """
+        matches = []
+        pending = []
+        seen = set()
+        matched_targets = set()
         
-        # Находим столбцы для обработки
-        found_columns = []
-        for target_col in TARGET_COLUMNS:
-            if target_col in df.columns:
-                found_columns.append(target_col)
+        for position, col in enumerate(columns):
+            if col in seen:
+                continue
+            if col in self._exact:
+                matches.append((position, col, col, "exact"))
+                matched_targets.add(col)
+                seen.add(col)
+                continue
+            normalized = _normalize_header(col)
+            target = self._normalized.get(normalized)
+            if target is not None:
+                matches.append((position, col, target, "normalized"))
+                matched_targets.add(target)
+                seen.add(col)
             else:
-                # Попробуем найти похожие столбцы (с учетом возможных различий в пробелах)
-                similar_cols = [col for col in df.columns if target_col.replace(" ", "").lower() in col.replace(" ", "").lower()]
-                if similar_cols:
-                    found_columns.extend(similar_cols)
-                    print(f"Найден похожий столбец для '{target_col}': {similar_cols}")
+                pending.append((position, col, normalized))
         
-        if not found_columns:
-            print(f"⚠️  В файле не найдено ни одного целевого столбца!")
+        if self._fuzzy is not None:
+            for position, col, normalized in pending:
+                if col in seen:
+                    continue
+                found = self._fuzzy.search(normalized)
+                if found is None:
+                    continue
+                target = self._normalized[found.group(1)]
+                if target not in matched_targets:
+                    matches.append((position, col, target, "fuzzy"))
+                    seen.add(col)
+        
+        matches.sort(key=lambda match: (self._order[match[2]], match[0]))
+        return [(col, target, rule) for _, col, target, rule in matches]
+
+_matcher_cache = {}
+
+def get_column_matcher():
+    """Возвращает скомпилированный поиск для текущего списка TARGET_COLUMNS."""
+    key = tuple(TARGET_COLUMNS)
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        matcher = _matcher_cache[key] = ColumnMatcher(key)
+    return matcher
+
+def match_target_columns(columns):
+    """
+    Находит целевые столбцы и правило, по которому найден каждый из них.
+    
+    Args:
+        columns (list): Заголовки столбцов
+    
+    Returns:
+        list: Кортежи (заголовок, целевой столбец, правило)
+    """
+    return get_column_matcher().match(list(columns))
+
+class HeaderCache:
+    """
+    Кеш разбора заголовков по сигнатуре строки заголовков.
+    
+    Файлы из одного шаблона имеют одинаковые заголовки, поэтому найденные
+    столбцы и план преобразования значений вычисляются один раз на шаблон.
+    Запись кеша - словарь:
+      "matches"      - результат match_target_columns
+      "positions"    - {заголовок: номер первого столбца с этим заголовком}
+      "numeric_plan" - {заголовок: True если столбец уже имел числовой тип}
+    """
+    
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def signature(columns):
+        """Вычисляет сигнатуру заголовков с учетом текущего списка TARGET_COLUMNS."""
+        digest = hashlib.sha1()
+        for name in list(TARGET_COLUMNS) + ["\x00"] + [str(col) for col in columns]:
+            digest.update(name.encode("utf-8", "surrogatepass"))
+            digest.update(b"\x1f")
+        return digest.hexdigest()
+    
+    def resolve(self, columns):
+        """
+        Возвращает запись кеша для заголовков, при промахе вычисляет ее.
+        
+        Returns:
+            tuple: (запись кеша, True если запись найдена в кеше)
+        """
+        columns = list(columns)
+        key = self.signature(columns)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+        
+        self.misses += 1
+        positions = {}
+        for i, col in enumerate(columns):
+            positions.setdefault(col, i)
+        entry = {
+            "matches": match_target_columns(columns),
+            "positions": positions,
+            "numeric_plan": {},
+        }
+        self._entries[key] = entry
+        return entry, False
+    
+    def stats(self):
+        """Возвращает счетчики попаданий и промахов."""
+        return {"cache_hits": self.hits, "cache_misses": self.misses}
+
+_header_cache = HeaderCache()
+
+def resolve_target_columns(columns):
+    """
+    Находит целевые столбцы с использованием кеша по сигнатуре заголовков.
+    
+    Returns:
+        tuple: (запись кеша, True если заголовки уже встречались)
+    """
+    return _header_cache.resolve(columns)
+
+def find_target_columns(columns):
+    """
+    Находит целевые столбцы среди заголовков таблицы.
+    
+    Args:
+        columns (list): Заголовки столбцов
+    
+    Returns:
+        list: Найденные заголовки в порядке TARGET_COLUMNS
+    """
+    return _report_matches(*resolve_target_columns(columns))
+
+def _report_matches(entry, cached):
+    """Возвращает найденные заголовки из записи кеша, сообщая о неточных совпадениях."""
+    found_columns = []
+    for col, target_col, rule in entry["matches"]:
+        found_columns.append(col)
+        if rule != "exact" and not cached:
+            print(f"Найден похожий столбец для '{target_col}': '{col}' (правило: {rule})")
+    return found_columns
+
+def _is_numeric_cell(value):
+    """Проверяет, является ли значение ячейки числом (как pd.to_numeric с errors='coerce')."""
+    if isinstance(value, bool) or value is None:
+        return False
+    if isinstance(value, (int, float)):
+        return value == value  # NaN не считается числом
+    if isinstance(value, str):
+        try:
+            return float(value) == float(value)
+        except ValueError:
             return False
+    return False
+
+def read_target_columns(file_path):
+    """
+    Читает из листов, подходящих под SHEET_PATTERN, только заголовок и целевые столбцы.
+    
+    Книга открывается один раз. Для каждого листа сначала разбирается строка
+    заголовков и определяются целевые столбцы, затем из XML листа выбираются
+    только ячейки этих столбцов (xlsx_patch.iter_column_values); остальные
+    ячейки не разбираются.
+    
+    Args:
+        file_path (str): Путь к файлу
+    
+    Returns:
+        list: Для каждого листа кортеж (имя листа, DataFrame с целевыми столбцами
+              (индекс - номера строк листа, в которых есть ячейки этих столбцов),
+              найденные столбцы, все заголовки)
+    """
+    import pandas as pd
+    import xlsx_patch
+    
+    selected = []
+    sheets = {}
+    
+    def select_sheets(names):
+        selected.extend(name for name in names if sheet_selected(name))
+        return selected
+    
+    def select_columns(sheet_name, headers):
+        entry, cached = resolve_target_columns(headers)
+        found_columns = _report_matches(entry, cached)
+        sheets[sheet_name] = (found_columns, list(headers), {col: {} for col in found_columns})
+        return found_columns
+    
+    for sheet_name, col, rows, values in xlsx_patch.iter_column_values(file_path, select_columns, select_sheets):
+        column = sheets[sheet_name][2][col]
+        for row, value in zip(rows, values):
+            # Для повторяющихся заголовков берем первый (левый) столбец, как pandas
+            column.setdefault(row, value)
+    
+    result = []
+    for sheet_name in selected:
+        found_columns, columns, data = sheets.get(sheet_name, ([], [], {}))
+        index = sorted(set().union(*data.values()))
+        df = pd.DataFrame({col: [data[col].get(row) for row in index] for col in found_columns},
+                          index=index, columns=found_columns)
+        result.append((sheet_name, df, found_columns, columns))
+    return result
+
+def analyze_excel_file(file_path):
+    """
+    Выводит информацию о целевых столбцах листов файла без изменений.
+    
+    Args:
+        file_path (str): Путь к файлу
+    
+    Returns:
+        bool: True если целевые столбцы найдены хотя бы на одном листе
+    """
+    import pandas as pd
+    
+    sheets = read_target_columns(file_path)
+    if not sheets:
+        print(f"⚠️  В файле нет листов, подходящих под шаблон '{SHEET_PATTERN}'")
+        return False
+    
+    found_any = False
+    for sheet_name, df, found_columns, columns in sheets:
+        print(f"Лист '{sheet_name}': {df.shape[0]} строк, {len(columns)} столбцов")
+        print(f"Столбцы в файле: {columns}")
         
-        print(f"Найденные столбцы для обработки: {found_columns}")
+        if not found_columns:
+            print(f"  На листе не найдено целевых столбцов")
+            continue
         
-        if test_mode:
-            # В тестовом режиме только показываем информацию
-            for col in found_columns:
-                if col in df.columns:
-                    non_null_count = df[col].notna().sum()
-                    if non_null_count > 0:
-                        current_min = df[col].min()
-                        current_max = df[col].max()
-                        print(f"  {col}: {non_null_count} значений, диапазон: {current_min:.4f} - {current_max:.4f}")
-                    else:
-                        print(f"  {col}: нет данных")
-            return True
+        found_any = True
+        print(f"Найденные столбцы для обработки: {found_columns}")
         
-        # Обрабатываем найденные столбцы
-        changes_made = False
         for col in found_columns:
-            if col in df.columns:
-                # Находим строки с числовыми значениями
-                numeric_mask = pd.to_numeric(df[col], errors='coerce').notna()
-                numeric_count = numeric_mask.sum()
-                
-                if numeric_count > 0:
-                    print(f"  Обновляем {numeric_count} значений в столбце '{col}'")
-                    
-                    # Генерируем новые случайные значения
-                    new_values = [generate_random_value() for _ in range(numeric_count)]
-                    
-                    # Применяем новые значения
-                    df.loc[numeric_mask, col] = new_values
-                    changes_made = True
-                    
-                    # Показываем примеры новых значений
-                    sample_values = new_values[:3]
-                    print(f"    Примеры новых значений: {sample_values}")
+            values = pd.to_numeric(df[col], errors='coerce')
+            non_null_count = values.notna().sum()
+            if non_null_count > 0:
+                print(f"  {col}: {non_null_count} значений, диапазон: {values.min():.4f} - {values.max():.4f}")
+            else:
+                print(f"  {col}: нет данных")
+    
+    if not found_any:
+        print(f"⚠️  В файле не найдено ни одного целевого столбца!")
+    return found_any
+
+def _process_excel_file_streaming(file_path, output_path):
+    """
+    Обрабатывает листы файла построчно через openpyxl.
+    
+    Исходный файл читается в режиме read_only, результат пишется через
+    write_only книгу, поэтому в памяти одновременно находится одна строка.
+    Листы, не подходящие под SHEET_PATTERN, копируются без изменения значений.
+    
+    Args:
+        file_path (str): Путь к исходному файлу
+        output_path (str): Путь для сохранения результата
+    
+    Returns:
+        bool: True если значения были изменены и файл сохранен
+    """
+    from openpyxl import Workbook, load_workbook
+    
+    source = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        target = Workbook(write_only=True)
+        values = _SheetValues(file_path)
+        found_any = False
+        changes_made = False
+        total_rows = 0
+        
+        for sheet in source.worksheets:
+            out_sheet = target.create_sheet(sheet.title)
+            rows = sheet.iter_rows(values_only=True)
+            if not sheet_selected(sheet.title):
+                for row in rows:
+                    out_sheet.append(row)
+                continue
+            
+            header = next(rows, None)
+            if header is None:
+                print(f"Лист '{sheet.title}' пуст")
+                continue
+            out_sheet.append(header)
+            
+            columns = ["" if value is None else str(value) for value in header]
+            print(f"Лист '{sheet.title}'")
+            print(f"Столбцы в файле: {columns}")
+            
+            found_columns = find_target_columns(columns)
+            if not found_columns:
+                print(f"  На листе не найдено целевых столбцов")
+                for row in rows:
+                    out_sheet.append(row)
+                continue
+            
+            found_any = True
+            print(f"Найденные столбцы для обработки: {found_columns}")
+            
+            found_set = set(found_columns)
+            target_indexes = [i for i, col in enumerate(columns) if col in found_set]
+            counts = dict.fromkeys(target_indexes, 0)
+            
+            row_count = 0
+            for row in rows:
+                row = list(row)
+                for i in target_indexes:
+                    if i < len(row) and _is_numeric_cell(row[i]):
+                        row[i] = values.next(sheet.title, columns[i])
+                        counts[i] += 1
+                out_sheet.append(row)
+                row_count += 1
+            total_rows += row_count
+            
+            print(f"Размер таблицы: {row_count} строк, {len(columns)} столбцов")
+            for i, count in counts.items():
+                if count:
+                    print(f"  Обновлено {count} значений в столбце '{columns[i]}'")
                 else:
-                    print(f"  В столбце '{col}' нет числовых значений для обновления")
+                    print(f"  В столбце '{columns[i]}' нет числовых значений для обновления")
+            changes_made = changes_made or any(counts.values())
+        
+        if not found_any:
+            print(f"⚠️  В файле не найдено ни одного целевого столбца!")
+            return False
         
         if not changes_made:
             print("⚠️  Изменения не были внесены - не найдено числовых данных в целевых столбцах")
             return False
         
-        # Сохраняем обработанный файл
-        filename = os.path.basename(file_path)
-        output_path = os.path.join(OUTPUT_DIR, filename)
+        target.save(output_path)
+        _row_counts[file_path] = total_rows
+        return True
+    finally:
+        source.close()
+
+def _process_excel_file_patch(file_path, output_path):
+    """
+    Обрабатывает листы файла заменой значений прямо в XML листов.
+    
+    Таблица не загружается в pandas: переписываются только элементы <v>
+    целевых ячеек, остальные части книги копируются без изменений.
+    
+    Args:
+        file_path (str): Путь к исходному файлу
+        output_path (str): Путь для сохранения результата
+    
+    Returns:
+        bool: True если значения были изменены и файл сохранен
+    """
+    import xlsx_patch
+    
+    values = _SheetValues(file_path)
+    
+    def select_columns(sheet_name, columns):
+        print(f"Лист '{sheet_name}'")
+        print(f"Столбцы в файле: {columns}")
+        return find_target_columns(columns)
+    
+    results = xlsx_patch.patch_workbook(
+        file_path, output_path, select_columns, values.next,
+        select_sheets=lambda names: [name for name in names if sheet_selected(name)],
+    )
+    
+    found_any = False
+    changes_made = False
+    total_rows = 0
+    for sheet_name, columns, counts in results:
+        if not counts:
+            continue
+        found_any = True
+        print(f"Лист '{sheet_name}': найденные столбцы для обработки: {list(counts)}")
+        for col, count in counts.items():
+            if count:
+                print(f"  Обновлено {count} значений в столбце '{col}'")
+            else:
+                print(f"  В столбце '{col}' нет числовых значений для обновления")
+        changes_made = changes_made or any(counts.values())
+        # Число строк XML не считается; строки с числами в целевых столбцах - достаточная оценка объема
+        total_rows += max(counts.values())
+    
+    if not found_any:
+        print(f"⚠️  В файле не найдено ни одного целевого столбца!")
+        os.remove(output_path)
+        return False
+    
+    if not changes_made:
+        print("⚠️  Изменения не были внесены - не найдено числовых данных в целевых столбцах")
+        os.remove(output_path)
+        return False
+    
+    _row_counts[file_path] = total_rows
+    return True
+
+def _read_workbook(file_path):
+    """
+    Читает все листы книги в словарь {имя листа: DataFrame} за один разбор.
+    
+    Листы читаются без разбора заголовков (header=None, исходные значения ячеек):
+    строка заголовков остается первой строкой таблицы, поэтому листы, которые
+    не изменяются, записываются обратно как есть - без "Unnamed: 1" вместо пустых
+    заголовков и суффиксов ".1" у повторяющихся.
+    """
+    import pandas as pd
+    
+    with span("read", file=file_path):
+        return pd.read_excel(file_path, sheet_name=None, header=None, dtype=object)
+
+def _table_with_header(raw):
+    """
+    Строит таблицу с заголовками из листа, прочитанного без заголовков.
+    
+    Имена и типы столбцов те же, что дает pd.read_excel с header=0.
+    
+    Args:
+        raw (DataFrame): Лист из _read_workbook
+    
+    Returns:
+        DataFrame: Таблица данных с заголовками из первой строки листа
+    """
+    import pandas as pd
+    from pandas.io.parsers import TextParser
+    
+    if raw.empty:
+        return pd.DataFrame()
+    rows = raw.to_numpy().tolist()
+    # read_excel передает пустые заголовки пустыми строками, из них получаются "Unnamed: N"
+    rows[0] = ["" if pd.isna(value) else value for value in rows[0]]
+    return TextParser(rows, header=0).read()
+
+def _restore_header(raw, table):
+    """Возвращает лист с исходной строкой заголовков и данными таблицы table."""
+    sheet = raw.copy()
+    sheet.iloc[1:, :] = table.to_numpy(dtype=object)
+    return sheet
+
+def _randomize_workbook(file_path, sheets):
+    """
+    Заменяет значения целевых столбцов на листах, подходящих под SHEET_PATTERN.
+    
+    Измененные листы заменяются в словаре, остальные листы остаются без изменений.
+    
+    Args:
+        file_path (str): Путь к исходному файлу
+        sheets (dict): {имя листа: DataFrame} из _read_workbook, изменяется на месте
+    
+    Returns:
+        bool: True если были внесены изменения
+    """
+    found_any = False
+    changes_made = False
+    total_rows = 0
+    for sheet_name, raw in list(sheets.items()):
+        if not sheet_selected(sheet_name):
+            continue
+        
+        df = _table_with_header(raw)
+        print(f"Лист '{sheet_name}': {df.shape[0]} строк, {df.shape[1]} столбцов")
+        print(f"Столбцы в файле: {list(df.columns)}")
+        total_rows += df.shape[0]
         
-        df.to_excel(output_path, index=False)
-        print(f"✅ Файл сохранен: {output_path}")
+        # Находим столбцы для обработки
+        with span("resolve", file=file_path):
+            entry, cached = resolve_target_columns(df.columns)
+            found_columns = _report_matches(entry, cached)
         
-        # Сохраняем временные метки исходного файла, если включена опция
-        if PRESERVE_FILE_DATES:
-            preserve_file_timestamps(file_path, output_path)
+        if not found_columns:
+            print(f"  На листе не найдено целевых столбцов")
+            continue
         
-        return True
+        found_any = True
+        print(f"Найденные столбцы для обработки: {found_columns}")
         
-    except Exception as e:
-        print(f"❌ Ошибка при обработке файла {file_path}: {str(e)}")
+        with span("generate", file=file_path):
+            if _randomize_dataframe(df, found_columns, entry["numeric_plan"], (file_path, sheet_name)):
+                sheets[sheet_name] = _restore_header(raw, df)
+                changes_made = True
+    _row_counts[file_path] = total_rows
+    
+    if not found_any:
+        print(f"⚠️  В файле не найдено ни одного целевого столбца!")
+        return False
+    
+    if not changes_made:
+        print("⚠️  Изменения не были внесены - не найдено числовых данных в целевых столбцах")
         return False
+    return True
 
-def main():
-    """Основная функция."""
-    global PRESERVE_FILE_DATES
+def _write_workbook(file_path, sheets, output_path):
+    """Записывает все листы книги в output_path одним ExcelWriter (заголовки - первая строка листов)."""
+    import pandas as pd
     
-    print("🔧 Скрипт рандомизации значений в Excel файлах")
-    print("=" * 50)
-    print(f"📊 Диапазон значений: {MIN_VALUE} - {MAX_VALUE}")
-    print(f"📅 Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
+    with span("write", file=file_path):
+        with pd.ExcelWriter(output_path) as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False, header=False)
+
+def _process_excel_file_pandas(file_path, output_path):
+    """
+    Обрабатывает листы файла через pandas.
     
-    # Создаем необходимые директории
-    create_directories()
+    Книга разбирается один раз (все листы читаются в словарь таблиц),
+    результат со всеми листами записывается одним ExcelWriter.
     
-    # Находим все Excel файлы
-    excel_files = glob.glob(os.path.join(INPUT_DIR, "*.xlsx"))
+    Args:
+        file_path (str): Путь к исходному файлу
+        output_path (str): Путь для сохранения результата
     
-    if not excel_files:
-        print(f"❌ В папке {INPUT_DIR} не найдено Excel файлов!")
-        return
+    Returns:
+        bool: True если значения были изменены и файл сохранен
+    """
+    sheets = _read_workbook(file_path)
+    if not _randomize_workbook(file_path, sheets):
+        return False
     
-    print(f"Найдено {len(excel_files)} Excel файлов")
+    # Сохраняем обработанный файл со всеми листами
+    _write_workbook(file_path, sheets, output_path)
+    return True
+
+def output_path_for(file_path):
+    """Возвращает путь результата обработки файла в OUTPUT_DIR."""
+    return os.path.join(OUTPUT_DIR, os.path.basename(file_path))
+
+def process_excel_file(file_path, test_mode=False):
+    """
+    Обрабатывает один Excel файл.
     
-    # Спрашиваем пользователя о режиме работы
-    print("\nВыберите режим работы:")
-    print("1. Тестовый режим (анализ без изменений)")
-    print("2. Обработка всех файлов")
-    print("3. Обработка одного файла для теста")
-    print("4. Настройки")
+    Args:
+        file_path (str): Путь к файлу
+        test_mode (bool): Если True, выводит информацию о найденных столбцах без изменений
     
+    Returns:
+        bool: True если файл успешно обработан, False в случае ошибки
+    """
+    with span("file", file=file_path):
+        return _process_excel_file(file_path, test_mode)
+
+def _process_excel_file(file_path, test_mode):
+    """Обработка одного файла (см. process_excel_file), каждый этап замеряется span."""
+    tmp_path = None
     try:
-        choice = input("Введите номер (1-4): ").strip()
-        
-        if choice == "1":
-            # Тестовый режим
-            print("\n🔍 ТЕСТОВЫЙ РЕЖИМ - анализ файлов без изменений")
-            for i, file_path in enumerate(excel_files[:5], 1):  # Анализируем первые 5 файлов
-                print(f"\n--- Файл {i}/5 ---")
-                process_excel_file(file_path, test_mode=True)
-                
-        elif choice == "2":
-            # Обработка всех файлов
-            print(f"\n🚀 Начинаем обработку {len(excel_files)} файлов...")
-            
-            successful = 0
-            failed = 0
+        print(f"\nОбработка файла: {file_path}")
+        
+        # Создаем резервную копию
+        if not test_mode:
+            with span("backup", file=file_path):
+                # Манифест описывает версию файла, с которой сделана копия, а не ту,
+                # что окажется на диске после обработки
+                _input_records[file_path] = backup_file(file_path)
+        
+        if test_mode:
+            # В тестовом режиме читаем только заголовок и целевые столбцы
+            with span("analyze", file=file_path):
+                return analyze_excel_file(file_path)
+        
+        output_path = output_path_for(file_path)
+        tmp_path = temp_output_path(output_path)
+        
+        if ENGINE == "pandas":
+            if not _process_excel_file_pandas(file_path, tmp_path):
+                return False
+        else:
+            process = _process_excel_file_streaming if ENGINE == "stream" else _process_excel_file_patch
+            with span(ENGINE, file=file_path):
+                if not process(file_path, tmp_path):
+                    return False
+        
+        commit_output(file_path, tmp_path, output_path)
+        print(f"✅ Файл сохранен: {output_path}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка при обработке файла {file_path}: {str(e)}")
+        return False
+    finally:
+        # Недописанный или ненужный временный файл не должен остаться в OUTPUT_DIR
+        if tmp_path is not None:
+            _remove_temp(tmp_path)
+
+def _randomize_dataframe(df, found_columns, numeric_plan, seed_key=None):
+    """
+    Заменяет числовые значения найденных столбцов таблицы случайными.
+    
+    Args:
+        df (DataFrame): Таблица, изменяется на месте
+        found_columns (list): Столбцы для обработки
+        numeric_plan (dict): План преобразования из кеша заголовков, дополняется
+        seed_key (tuple): (путь к файлу, имя листа) для потоков столбцов при заданном SEED
+    
+    Returns:
+        bool: True если были внесены изменения
+    """
+    import numpy as np
+    import pandas as pd
+    
+    # Находим строки с числовыми значениями во всех найденных столбцах
+    numeric_masks = {}
+    for col in found_columns:
+        if col in df.columns:
+            # Для столбцов шаблона, уже бывших числовыми, преобразование не нужно
+            is_numeric = pd.api.types.is_numeric_dtype(df[col].dtype)
+            if numeric_plan.get(col) and is_numeric:
+                numeric_mask = df[col].notna()
+            else:
+                numeric_mask = pd.to_numeric(df[col], errors='coerce').notna()
+                numeric_plan[col] = is_numeric
+            numeric_count = int(numeric_mask.sum())
             
+            if numeric_count > 0:
+                numeric_masks[col] = numeric_mask
+            else:
+                print(f"  В столбце '{col}' нет числовых значений для обновления")
+    
+    counts = [int(mask.sum()) for mask in numeric_masks.values()]
+    if SEED is not None and seed_key is not None:
+        # Воспроизводимые значения: у каждого столбца свой поток
+        column_values = [generate_random_values(count, rng=value_rng(*seed_key, col))
+                         for col, count in zip(numeric_masks, counts)]
+    else:
+        # Генерируем значения для всех столбцов одним массивом
+        all_values = generate_random_values(sum(counts))
+        column_values = np.split(all_values, np.cumsum(counts)[:-1]) if counts else []
+    
+    # Обрабатываем найденные столбцы
+    changes_made = False
+    for (col, numeric_mask), new_values in zip(numeric_masks.items(), column_values):
+        print(f"  Обновляем {len(new_values)} значений в столбце '{col}'")
+        
+        # Целочисленный столбец не может принять дробные значения
+        if pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = df[col].astype("float64")
+        
+        # Применяем новые значения
+        df.loc[numeric_mask, col] = new_values
+        changes_made = True
+        
+        # Показываем примеры новых значений
+        sample_values = new_values[:3].tolist()
+        print(f"    Примеры новых значений: {sample_values}")
+    
+    return changes_made
+
+def file_sha256(file_path):
+    """Вычисляет SHA-256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def settings_fingerprint():
+    """Отпечаток настроек, влияющих на результат обработки."""
+    settings = {
+        "TARGET_COLUMNS": list(TARGET_COLUMNS),
+        "MIN_VALUE": MIN_VALUE,
+        "MAX_VALUE": MAX_VALUE,
+        "VALUE_PRECISION": VALUE_PRECISION,
+        "ENGINE": ENGINE,
+        "SHEET_PATTERN": SHEET_PATTERN,
+        "SEED": SEED,
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def manifest_record(source, output_path, seconds=None, rows=None):
+    """
+    Создает запись манифеста для успешно обработанного файла.
+    
+    Размер, mtime и хеш берутся из записи хранилища резервных копий, сделанной
+    до обработки: если файл изменится во время обработки, манифест не совпадет
+    с новой версией и файл будет обработан повторно.
+    
+    Args:
+        source (dict): Запись хранилища резервных копий для обработанной версии файла
+        output_path (str): Путь результата
+        seconds (float): Время обработки файла (для модели стоимости)
+        rows (int): Количество строк данных (для модели стоимости)
+    
+    Returns:
+        dict: Размер, mtime_ns, хеш содержимого, отпечаток настроек, абсолютный путь
+              результата, время обработки и количество строк
+    """
+    return {
+        "size": source["size"],
+        "mtime_ns": source["mtime_ns"],
+        "sha256": source["object"],
+        "settings": settings_fingerprint(),
+        "output": os.path.abspath(output_path),
+        "seconds": seconds,
+        "rows": rows,
+    }
+
+class ProcessingManifest:
+    """
+    Постоянный манифест обработанных входных файлов.
+    
+    Файл считается актуальным, если совпадают отпечаток настроек, размер и
+    содержимое, а результат обработки все еще существует. Хеш содержимого
+    пересчитывается только при изменении mtime.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Не удалось прочитать манифест {path}: {str(e)}")
+    
+    @staticmethod
+    def _key(file_path):
+        return os.path.abspath(file_path)
+    
+    def is_up_to_date(self, file_path, fingerprint):
+        """Проверяет, что файл уже обработан с теми же настройками и не изменился."""
+        record = self.files.get(self._key(file_path))
+        if record is None or record.get("settings") != fingerprint:
+            return False
+        if not os.path.exists(record.get("output", "")):
+            return False
+        
+        stat = os.stat(file_path)
+        if stat.st_size != record["size"]:
+            return False
+        if stat.st_mtime_ns == record["mtime_ns"]:
+            return True
+        
+        # Файл мог быть перезаписан тем же содержимым
+        if file_sha256(file_path) != record["sha256"]:
+            return False
+        record["mtime_ns"] = stat.st_mtime_ns
+        return True
+    
+    def update(self, file_path, record):
+        """Сохраняет запись об успешно обработанном файле."""
+        self.files[self._key(file_path)] = record
+    
+    def get(self, file_path):
+        """Возвращает запись о файле или None."""
+        return self.files.get(self._key(file_path))
+    
+    def save(self):
+        """Атомарно записывает манифест на диск."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+def _fit_line(points):
+    """
+    Подбирает seconds = fixed + rate * x методом наименьших квадратов.
+    
+    Returns:
+        tuple: (fixed, rate) или None, если точек недостаточно
+    """
+    if not points:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        # Все файлы одного размера - только пропорциональная оценка
+        return (0.0, mean_y / mean_x) if mean_x else None
+    rate = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    fixed = mean_y - rate * mean_x
+    if rate <= 0 or fixed < 0:
+        rate = sum(y for _, y in points) / sum(x for x, _ in points)
+        fixed = 0.0
+    return fixed, rate
+
+class CostModel:
+    """
+    Оценка времени обработки файлов по истории прошлых запусков.
+    
+    Используются записи манифеста с теми же настройками, а если таких нет - все записи.
+    Файл, уже обработанный с теми же настройками, оценивается по своему прошлому
+    времени с поправкой на изменение размера. Для остальных время определяется
+    линейной зависимостью (постоянные затраты на файл + затраты на строку) по
+    числу строк из прошлого запуска, а если оно неизвестно - по размеру файла.
+    """
+    
+    def __init__(self, manifest, fingerprint=None):
+        self.manifest = manifest
+        self.fingerprint = fingerprint
+        history = [r for r in manifest.files.values() if r.get("seconds") and r.get("size")]
+        history = [r for r in history if r.get("settings") == fingerprint] or history
+        
+        self.by_size = _fit_line([(r["size"], r["seconds"]) for r in history]) or \
+            (0.0, COST_SECONDS_PER_MB / (1 << 20))
+        self.by_rows = _fit_line([(r["rows"], r["seconds"]) for r in history if r.get("rows")])
+    
+    def estimate(self, file_path):
+        """Возвращает оценку времени обработки файла в секундах."""
+        size = os.path.getsize(file_path)
+        record = self.manifest.get(file_path)
+        if record and record.get("size"):
+            scale = size / record["size"]
+            if record.get("seconds") and record.get("settings") == self.fingerprint:
+                return record["seconds"] * scale
+            if record.get("rows") and self.by_rows:
+                fixed, rate = self.by_rows
+                return fixed + rate * record["rows"] * scale
+        fixed, rate = self.by_size
+        return fixed + rate * size
+
+def plan_schedule(excel_files, estimates, workers):
+    """
+    Упорядочивает файлы для параллельной обработки: сначала самые долгие.
+    
+    Свободный процесс берет следующий файл из очереди, поэтому при таком порядке
+    крупные файлы запускаются первыми на отдельных процессах, а мелкие заполняют
+    остальные процессы и не задерживают окончание пакета.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        estimates (dict): {путь: оценка времени в секундах}
+        workers (int): Количество процессов
+    
+    Returns:
+        tuple: (упорядоченные файлы, оценка времени всего пакета в секундах)
+    """
+    import heapq
+    
+    ordered = sorted(excel_files, key=lambda path: -estimates[path])
+    finish_times = [0.0] * max(1, workers)
+    for path in ordered:
+        heapq.heapreplace(finish_times, finish_times[0] + estimates[path])
+    return ordered, max(finish_times)
+
+def print_schedule_report(summary):
+    """Выводит оценку и фактическое время обработки файлов (для настройки модели стоимости)."""
+    schedule = summary.get("schedule")
+    if not schedule:
+        return
+    
+    print(f"\n🗓️  Оценка времени: пакет {schedule['predicted']:.1f} с, факт {schedule['actual']:.1f} с")
+    files = sorted(schedule["files"], key=lambda item: -item["actual"])
+    print(f"  {'файл':<32}{'оценка':>10}{'факт':>10}")
+    for item in files[:SCHEDULE_REPORT_LIMIT]:
+        print(f"  {os.path.basename(item['file'])[:31]:<32}{item['predicted']:>10.2f}{item['actual']:>10.2f}")
+    if len(files) > SCHEDULE_REPORT_LIMIT:
+        print(f"  ... еще {len(files) - SCHEDULE_REPORT_LIMIT} файлов")
+
+def _current_settings():
+    """Возвращает текущие настройки модуля для передачи в рабочие процессы."""
+    return {
+        "INPUT_DIR": INPUT_DIR,
+        "OUTPUT_DIR": OUTPUT_DIR,
+        "BACKUP_DIR": BACKUP_DIR,
+        "TARGET_COLUMNS": list(TARGET_COLUMNS),
+        "MIN_VALUE": MIN_VALUE,
+        "MAX_VALUE": MAX_VALUE,
+        "PRESERVE_FILE_DATES": PRESERVE_FILE_DATES,
+        "ENGINE": ENGINE,
+        "SHEET_PATTERN": SHEET_PATTERN,
+        "SEED": SEED,
+        "VALUE_PRECISION": VALUE_PRECISION,
+        "BACKUP_STRATEGY": BACKUP_STRATEGY,
+        "BACKUP_COMPRESS": BACKUP_COMPRESS,
+        "TIMINGS": TIMINGS,
+        "TIMINGS_FILE": TIMINGS_FILE,
+        "FSYNC_MODE": FSYNC_MODE,
+    }
+
+def configure_instrumentation():
+    """Включает замер этапов согласно TIMINGS и TIMINGS_FILE."""
+    if TIMINGS or TIMINGS_FILE:
+        sink = instrumentation.JsonLinesSink(TIMINGS_FILE) if TIMINGS_FILE else None
+        instrumentation.enable(sink)
+
+def _init_worker(settings):
+    """Применяет настройки родительского процесса в рабочем процессе."""
+    import signal
+    
+    # Ctrl+C обрабатывает родительский процесс, рабочие завершают текущий файл
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    globals().update(settings)
+    # Длительности, унаследованные от родительского процесса, уже учтены в нем
+    instrumentation.reset()
+    configure_instrumentation()
+
+def _new_worker_pool(workers):
+    """Создает пул рабочих процессов с настройками текущего процесса."""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_current_settings(),))
+
+class _FilePool:
+    """
+    Пул процессов обработки файлов, переживающий аварийное завершение рабочего процесса.
+    
+    Когда рабочий процесс аварийно завершается (нехватка памяти, сбой библиотеки),
+    ProcessPoolExecutor отменяет все файлы пула, в том числе еще не начатые. Пул
+    пересоздается при следующей отправке файла, а файлы сломанного пула повторно
+    обрабатываются по одному в отдельном процессе: ошибкой считается только файл,
+    который аварийно завершает и этот процесс.
+    
+    Args:
+        workers (int): Количество процессов основного пула
+    """
+    
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = _new_worker_pool(workers)
+        self._retry_executor = None
+        self._retry_queue = []
+        self._futures = {}
+    
+    def __len__(self):
+        """Количество файлов в работе, включая ожидающие повторной обработки."""
+        return len(self._futures) + len(self._retry_queue)
+    
+    @property
+    def pending(self):
+        """Количество файлов, отправленных в основной пул и еще не завершенных."""
+        return sum(1 for _, retry in self._futures.values() if not retry)
+    
+    def files(self):
+        """Возвращает пути файлов в работе."""
+        return {file_path for file_path, _ in self._futures.values()} | set(self._retry_queue)
+    
+    def submit(self, file_path):
+        """Отправляет файл в основной пул, пересоздавая пул после аварийного завершения процесса."""
+        from concurrent.futures.process import BrokenProcessPool
+        
+        try:
+            future = self._executor.submit(_process_file_task, file_path)
+        except BrokenProcessPool:
+            print("⚠️  Рабочий процесс аварийно завершился, пул процессов перезапущен")
+            self._executor.shutdown(wait=True)
+            self._executor = _new_worker_pool(self.workers)
+            future = self._executor.submit(_process_file_task, file_path)
+        self._futures[future] = (file_path, False)
+    
+    def _retry_next(self):
+        # Повторная обработка по одному файлу, чтобы сбой указывал на конкретный файл
+        if not self._retry_queue or any(retry for _, retry in self._futures.values()):
+            return
+        if self._retry_executor is None:
+            self._retry_executor = _new_worker_pool(1)
+        file_path = self._retry_queue.pop(0)
+        self._futures[self._retry_executor.submit(_process_file_task, file_path)] = (file_path, True)
+    
+    def wait(self, timeout=None):
+        """
+        Ждет завершения хотя бы одного файла или истечения timeout.
+        
+        Returns:
+            list: Записи о статусе завершенных файлов (см. _process_file_task)
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from concurrent.futures.process import BrokenProcessPool
+        
+        self._retry_next()
+        done, _ = wait(list(self._futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        statuses = []
+        for future in done:
+            file_path, retry = self._futures.pop(future)
+            try:
+                statuses.append(future.result())
+            except BrokenProcessPool as e:
+                if not retry:
+                    # Файл мог быть отменен из-за сбоя другого файла пула
+                    self._retry_queue.append(file_path)
+                    continue
+                self._retry_executor.shutdown(wait=True)
+                self._retry_executor = None
+                statuses.append({"file": file_path, "ok": False, "error": f"рабочий процесс аварийно завершился: {e}"})
+            except Exception as e:
+                statuses.append({"file": file_path, "ok": False, "error": str(e)})
+        self._retry_next()
+        return statuses
+    
+    def shutdown(self):
+        """Останавливает процессы, не начатые файлы отменяются."""
+        for executor in (self._executor, self._retry_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+def _process_file_task(file_path):
+    """
+    Обрабатывает один файл в рабочем процессе.
+    
+    Результат записывается на диск самим процессом, родителю возвращается
+    только короткая запись о статусе.
+    
+    Returns:
+        dict: {"file": путь, "ok": успех, "error": текст ошибки или None,
+               "cache_hits"/"cache_misses": обращения к кешу заголовков,
+               "seconds": время обработки, "rows": количество строк данных,
+               "manifest": запись манифеста для успешно обработанного файла}
+    """
+    import time
+    
+    before = _header_cache.stats()
+    started = time.perf_counter()
+    try:
+        status = {"file": file_path, "ok": bool(process_excel_file(file_path)), "error": None}
+        status["seconds"] = time.perf_counter() - started
+        rows = _row_counts.pop(file_path, None)
+        status["rows"] = rows
+        source = _input_records.pop(file_path, None)
+        if status["ok"] and source is not None:
+            status["manifest"] = manifest_record(source, output_path_for(file_path), status["seconds"], rows)
+    except Exception as e:
+        status = {"file": file_path, "ok": False, "error": str(e)}
+    for key, value in _header_cache.stats().items():
+        status[key] = value - before[key]
+    if instrumentation.is_enabled():
+        status["spans"] = instrumentation.drain()
+    return status
+
+def _record_status(summary, status, manifest=None):
+    """Учитывает запись о статусе файла в итогах обработки и манифесте."""
+    if status["ok"]:
+        summary["successful"] += 1
+        if FSYNC_MODE == "batch":
+            # Результат записан рабочим процессом, на диск его сбрасывает sync_outputs
+            _unsynced_outputs.add(output_path_for(status["file"]))
+        if manifest is not None and status.get("manifest"):
+            manifest.update(status["file"], status["manifest"])
+    else:
+        summary["failed"] += 1
+        if status["error"]:
+            print(f"❌ Ошибка при обработке файла {status['file']}: {status['error']}")
+    summary["cache_hits"] += status.get("cache_hits", 0)
+    summary["cache_misses"] += status.get("cache_misses", 0)
+    if status.get("spans"):
+        timings = summary.setdefault("timings", {})
+        for name, values in status["spans"].items():
+            timings.setdefault(name, []).extend(values)
+
+def _pipeline_read_task(file_path):
+    """Этап чтения конвейера в процессе чтения: резервная копия и разбор книги."""
+    import time
+    
+    started = time.perf_counter()
+    print(f"\nОбработка файла: {file_path}")
+    with span("backup", file=file_path):
+        source = backup_file(file_path)
+    state = {"sheets": _read_workbook(file_path), "seconds": time.perf_counter() - started, "source": source}
+    if instrumentation.is_enabled():
+        state["spans"] = instrumentation.drain()
+    return state
+
+def _pipeline_write_task(file_path, sheets):
+    """Этап записи конвейера в процессе записи: сохранение книги на место результата."""
+    import time
+    
+    started = time.perf_counter()
+    output_path = output_path_for(file_path)
+    tmp_path = temp_output_path(output_path)
+    try:
+        _write_workbook(file_path, sheets, tmp_path)
+        commit_output(file_path, tmp_path, output_path)
+    finally:
+        _remove_temp(tmp_path)
+    print(f"✅ Файл сохранен: {output_path}")
+    result = {"seconds": time.perf_counter() - started}
+    if instrumentation.is_enabled():
+        result["spans"] = instrumentation.drain()
+    return result
+
+def _process_files_pipelined(excel_files, start, finish):
+    """
+    Обработка с перекрытием этапов (см. pipeline.py).
+    
+    Процессы чтения заранее разбирают следующие книги, текущий процесс
+    заменяет значения, процессы записи сохраняют результаты. Разбор и запись
+    книг выполняются в отдельных процессах, потому что openpyxl не освобождает GIL.
+    Журнал, манифест и итоги обновляются в вызывающем потоке через start и finish.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        start (callable): Вызывается перед подачей файла в конвейер
+        finish (callable): Получает запись о статусе обработанного файла
+    
+    Returns:
+        dict: Обращения к кешу заголовков за время обработки
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    
+    import pipeline
+    
+    settings = _current_settings()
+    readers = ProcessPoolExecutor(max_workers=PIPELINE_READERS, initializer=_init_worker, initargs=(settings,))
+    writers = ProcessPoolExecutor(max_workers=PIPELINE_WRITERS, initializer=_init_worker, initargs=(settings,))
+    
+    def read(file_path, _):
+        return readers.submit(_pipeline_read_task, file_path).result()
+    
+    def transform(file_path, state):
+        started = time.perf_counter()
+        state["changed"] = _randomize_workbook(file_path, state["sheets"])
+        state["seconds"] += time.perf_counter() - started
+        return state
+    
+    def write(file_path, state):
+        if state["changed"]:
+            result = writers.submit(_pipeline_write_task, file_path, state["sheets"]).result()
+            state["seconds"] += result["seconds"]
+            for name, values in result.get("spans", {}).items():
+                state.setdefault("spans", {}).setdefault(name, []).extend(values)
+        # Таблицы больше не нужны, память освобождается до выдачи результата
+        state["sheets"] = None
+        return state
+    
+    stages = [(read, PIPELINE_READERS), (transform, 1), (write, PIPELINE_WRITERS)]
+    max_bytes = PIPELINE_MAX_MB * (1 << 20) if PIPELINE_MAX_MB else None
+    print(f"Конвейерная обработка: {PIPELINE_READERS} процессов чтения, {PIPELINE_WRITERS} процессов записи, "
+          f"до {PIPELINE_MAX_WORKBOOKS} книг в работе")
+    
+    before = _header_cache.stats()
+    try:
+        results = pipeline.run_pipeline(excel_files, stages, max_items=PIPELINE_MAX_WORKBOOKS,
+                                        max_bytes=max_bytes, size=os.path.getsize, on_start=start)
+        for file_path, state, error in results:
+            status = {"file": file_path, "ok": error is None and state["changed"],
+                      "error": str(error) if error is not None else None,
+                      "seconds": state["seconds"] if state else 0.0,
+                      "rows": _row_counts.pop(file_path, None)}
+            if state and state.get("spans"):
+                status["spans"] = state["spans"]
+            if status["ok"]:
+                status["manifest"] = manifest_record(state["source"], output_path_for(file_path),
+                                                     status["seconds"], status["rows"])
+            finish(status)
+    finally:
+        readers.shutdown(cancel_futures=True)
+        writers.shutdown(cancel_futures=True)
+    return {key: value - before[key] for key, value in _header_cache.stats().items()}
+
+def open_journal():
+    """Открывает журнал массовой обработки в OUTPUT_DIR."""
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+    return journal.BatchJournal(os.path.join(OUTPUT_DIR, JOURNAL_FILE))
+
+def _prepare_batch(batch_journal, excel_files, resume):
+    """
+    Создает новый пакет в журнале или продолжает незавершенный.
+    
+    Returns:
+        tuple: (номер пакета, файлы для обработки)
+    """
+    batch = batch_journal.unfinished_batch() if resume else None
+    if batch is None:
+        if resume:
+            print("ℹ️  Незавершенной обработки не найдено, начинаем новую")
+        return batch_journal.start_batch(excel_files, settings_fingerprint()), excel_files
+    
+    if batch["settings"] != settings_fingerprint():
+        print("⚠️  Настройки изменились с момента запуска прерванной обработки")
+    
+    pending, interrupted = batch_journal.remaining(batch["id"])
+    for file_path, output_path in interrupted:
+        # Результат записывается атомарно, после сбоя может остаться только временный файл
+        output_path = output_path or output_path_for(file_path)
+        directory, name = os.path.split(output_path)
+        stem, extension = os.path.splitext(name)
+        for tmp_path in glob.glob(os.path.join(directory, f".{glob.escape(stem)}.*.tmp{extension}")):
+            _remove_temp(tmp_path)
+        print(f"↩️  Обработка прервана, файл будет обработан заново: {file_path}")
+    
+    files = [file_path for file_path, _ in interrupted] + pending
+    print(f"↩️  Продолжение обработки: осталось {len(files)} файлов")
+    return batch["id"], files
+
+def process_files(excel_files, workers=1, force=None, resume=False):
+    """
+    Обрабатывает список файлов последовательно или в пуле процессов.
+    
+    Файлы, которые по манифесту уже обработаны с текущими настройками и
+    не изменились, пропускаются. Состояние каждого файла записывается в журнал,
+    поэтому прерванную обработку можно продолжить.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        workers (int): Количество процессов; 1 - обработка в текущем процессе
+        force (bool): Обработать все файлы, игнорируя манифест (по умолчанию FORCE_REPROCESS)
+        resume (bool): Продолжить незавершенную обработку из журнала вместо excel_files
+    
+    Returns:
+        dict: Итоги обработки: "successful", "failed", "skipped", "cache_hits", "cache_misses",
+              "timings" - длительности этапов, если включен замер,
+              "schedule" - оценка и фактическое время пакета и файлов
+    """
+    import time
+    
+    if force is None:
+        force = FORCE_REPROCESS
+    summary = {"successful": 0, "failed": 0, "skipped": 0, "cache_hits": 0, "cache_misses": 0}
+    
+    batch_journal = open_journal()
+    batch_id, excel_files = _prepare_batch(batch_journal, excel_files, resume)
+    
+    manifest = ProcessingManifest(os.path.join(OUTPUT_DIR, MANIFEST_FILE))
+    if not force:
+        fingerprint = settings_fingerprint()
+        pending = []
+        for file_path in excel_files:
+            if manifest.is_up_to_date(file_path, fingerprint):
+                batch_journal.mark(batch_id, file_path, journal.DONE)
+            else:
+                pending.append(file_path)
+        summary["skipped"] = len(excel_files) - len(pending)
+        if summary["skipped"]:
+            print(f"⏭️  Пропущено без изменений: {summary['skipped']} (для повторной обработки используйте --force)")
+        excel_files = pending
+    
+    cost_model = CostModel(manifest, settings_fingerprint())
+    estimates = {file_path: cost_model.estimate(file_path) for file_path in excel_files}
+    if workers > 1:
+        excel_files, predicted = plan_schedule(excel_files, estimates, min(workers, len(excel_files)))
+    else:
+        predicted = sum(estimates.values())
+    schedule = {"predicted": predicted, "actual": 0.0, "files": []}
+    if excel_files:
+        summary["schedule"] = schedule
+    
+    sizes = {file_path: os.path.getsize(file_path) for file_path in excel_files}
+    reporter = None
+    if PROGRESS and excel_files:
+        reporter = progress.ProgressReporter(len(excel_files), sum(sizes.values()),
+                                             log_interval=PROGRESS_LOG_INTERVAL)
+    
+    def start(file_path):
+        batch_journal.mark(batch_id, file_path, journal.IN_PROGRESS, output=output_path_for(file_path))
+    
+    def finish(status):
+        _record_status(summary, status, manifest)
+        schedule["files"].append({"file": status["file"], "predicted": estimates[status["file"]],
+                                  "actual": status.get("seconds", 0.0)})
+        state = journal.DONE if status["ok"] else journal.FAILED
+        batch_journal.mark(batch_id, status["file"], state, error=status.get("error"))
+        if reporter is not None:
+            reporter.advance(sizes[status["file"]], status.get("rows"), status["ok"])
+    
+    started = time.perf_counter()
+    try:
+        pipelined = PIPELINE and workers <= 1 and len(excel_files) > 1
+        if pipelined and ENGINE != "pandas":
+            print(f"ℹ️  Конвейерная обработка доступна только для движка pandas, движок {ENGINE} работает потоково")
+            pipelined = False
+        elif pipelined and (os.cpu_count() or 1) < 2:
+            # Этапы разбора и записи занимают процессор, на одном ядре перекрывать нечего
+            print("ℹ️  Доступен один процессор, конвейерная обработка не ускорит работу")
+            pipelined = False
+        
+        if pipelined:
+            for key, value in _process_files_pipelined(excel_files, start, finish).items():
+                summary[key] += value
+        elif workers <= 1 or len(excel_files) <= 1:
             for i, file_path in enumerate(excel_files, 1):
                 print(f"\n--- Файл {i}/{len(excel_files)} ---")
-                if process_excel_file(file_path):
-                    successful += 1
-                else:
-                    failed += 1
-            
-            print(f"\n📊 РЕЗУЛЬТАТЫ:")
-            print(f"✅ Успешно обработано: {successful}")
-            print(f"❌ Ошибок: {failed}")
+                start(file_path)
+                finish(_process_file_task(file_path))
+        else:
+            workers = min(workers, len(excel_files))
+            print(f"Параллельная обработка: {workers} процессов, оценка времени {predicted:.1f} с (сначала самые долгие файлы)")
             
-        elif choice == "3":
-            # Обработка одного файла для теста
-            print(f"\n🧪 Тестовая обработка первого файла: {excel_files[0]}")
-            if process_excel_file(excel_files[0]):
-                print("✅ Тестовая обработка завершена успешно!")
-            else:
-                print("❌ Ошибка при тестовой обработке")
+            pool = _FilePool(workers)
+            try:
+                # Файлы отправляются скользящим окном, чтобы состояние in_progress
+                # в журнале соответствовало файлам, действительно находящимся в работе
+                queue = iter(excel_files)
+                
+                def fill():
+                    while pool.pending < workers * 2:
+                        file_path = next(queue, None)
+                        if file_path is None:
+                            return
+                        start(file_path)
+                        pool.submit(file_path)
                 
-        elif choice == "4":
-            # Настройки сохранения временных меток
-            print(f"\n⚙️  НАСТРОЙКИ")
-            print(f"Диапазон значений: {MIN_VALUE} - {MAX_VALUE}")
-            print(f"Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
-            print("\nОпция сохранения временных меток позволяет:")
-            print("- Сохранить дату создания и изменения исходных файлов")
-            print("- Обработанные файлы будут иметь те же временные метки, что и исходные")
-            print("- Полезно для сохранения хронологии данных")
+                fill()
+                done_count = 0
+                while len(pool):
+                    for status in pool.wait():
+                        finish(status)
+                        done_count += 1
+                        print(f"--- Готово {done_count}/{len(excel_files)}: {os.path.basename(status['file'])} ---")
+                    fill()
+            finally:
+                pool.shutdown()
+        
+        schedule["actual"] = time.perf_counter() - started
+        sync_outputs()
+        batch_journal.finish_batch(batch_id)
+        return summary
+    finally:
+        if reporter is not None:
+            reporter.close()
+        manifest.save()
+        batch_journal.close()
+
+def find_excel_files():
+    """Находит все Excel файлы в INPUT_DIR."""
+    with span("discovery"):
+        return sorted(glob.glob(os.path.join(INPUT_DIR, "*.xlsx")))
+
+def sample_excel_file(file_path, sample_rows=None):
+    """
+    Быстрый анализ файла по заголовкам и первым строкам листов.
+    
+    Ничего не выводит, поэтому подходит для запуска в рабочих процессах.
+    
+    Args:
+        file_path (str): Путь к файлу
+        sample_rows (int): Количество строк выборки (по умолчанию ANALYZE_SAMPLE_ROWS)
+    
+    Returns:
+        dict: {"file", "error", "sheets": [{"name", "rows", "columns": {заголовок:
+              {"target", "rule", "count", "min", "max"}}}]}
+    """
+    import xlsx_patch
+    
+    report = {"file": file_path, "error": None, "sheets": []}
+    try:
+        sheets = xlsx_patch.read_sample(
+            file_path, select_sheets=lambda names: [name for name in names if sheet_selected(name)],
+            max_rows=sample_rows or ANALYZE_SAMPLE_ROWS,
+        )
+    except Exception as e:
+        report["error"] = str(e)
+        return report
+    
+    for sheet_name, headers, rows in sheets:
+        entry, _ = resolve_target_columns(headers)
+        columns = {}
+        for col, target_col, rule in entry["matches"]:
+            i = entry["positions"][col]
+            values = [float(row[i]) for row in rows if i < len(row) and _is_numeric_cell(row[i])]
+            columns[col] = {"target": target_col, "rule": rule, "count": len(values),
+                            "min": min(values) if values else None, "max": max(values) if values else None}
+        report["sheets"].append({"name": sheet_name, "rows": len(rows), "columns": columns})
+    return report
+
+def _print_sample_report(report):
+    """Выводит результат быстрого анализа файла одной строкой на лист."""
+    name = os.path.basename(report["file"])
+    if report["error"]:
+        print(f"❌ {name}: {report['error']}")
+        return
+    if not any(sheet["columns"] for sheet in report["sheets"]):
+        print(f"⚠️  {name}: целевые столбцы не найдены")
+        return
+    print(f"📄 {name}")
+    for sheet in report["sheets"]:
+        if not sheet["columns"]:
+            continue
+        parts = []
+        for col, info in sheet["columns"].items():
+            text = f"{col} [{info['min']:.4f}..{info['max']:.4f}]" if info["count"] else f"{col} [нет чисел]"
+            if info["rule"] != "exact":
+                text += f" ~ {info['target']}"
+            parts.append(text)
+        print(f"  {sheet['name']} ({sheet['rows']} строк выборки): {', '.join(parts)}")
+
+def run_quick_analysis(excel_files, sample_rows=None, workers=None):
+    """
+    Быстрый анализ всех файлов без изменений: заголовки и первые строки листов.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        sample_rows (int): Количество строк выборки (по умолчанию ANALYZE_SAMPLE_ROWS)
+        workers (int): Количество процессов (по умолчанию ANALYZE_WORKERS или число процессоров)
+    
+    Returns:
+        list: Результаты sample_excel_file в порядке файлов
+    """
+    import time
+    
+    sample_rows = sample_rows or ANALYZE_SAMPLE_ROWS
+    workers = min(workers or ANALYZE_WORKERS or os.cpu_count() or 1, len(excel_files))
+    print(f"\n🔍 БЫСТРЫЙ АНАЛИЗ - заголовки и первые {sample_rows} строк листов, {len(excel_files)} файлов")
+    
+    started = time.perf_counter()
+    if workers <= 1:
+        reports = [sample_excel_file(file_path, sample_rows) for file_path in excel_files]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(_current_settings(),)) as executor:
+            # Файлы анализируются быстро, поэтому передаются процессам пачками
+            chunksize = max(1, len(excel_files) // (workers * 4))
+            reports = list(executor.map(sample_excel_file, excel_files,
+                                        [sample_rows] * len(excel_files), chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+    
+    totals = {}
+    for report in reports:
+        _print_sample_report(report)
+        for sheet in report["sheets"]:
+            for info in sheet["columns"].values():
+                total = totals.setdefault(info["target"], {"files": set(), "count": 0, "min": None, "max": None})
+                total["files"].add(report["file"])
+                if info["count"]:
+                    total["count"] += info["count"]
+                    total["min"] = info["min"] if total["min"] is None else min(total["min"], info["min"])
+                    total["max"] = info["max"] if total["max"] is None else max(total["max"], info["max"])
+    
+    print(f"\n📊 Целевые столбцы по выборке:")
+    for target_col in TARGET_COLUMNS:
+        total = totals.get(target_col)
+        if total is None:
+            print(f"  {target_col}: не найден ни в одном файле")
+        elif total["count"]:
+            print(f"  {target_col}: файлов {len(total['files'])}, значений {total['count']}, "
+                  f"диапазон {total['min']:.4f} - {total['max']:.4f}")
+        else:
+            print(f"  {target_col}: файлов {len(total['files'])}, числовых значений нет")
+    
+    without_targets = sum(1 for report in reports if not any(sheet["columns"] for sheet in report["sheets"]))
+    errors = sum(1 for report in reports if report["error"])
+    print(f"Без целевых столбцов: {without_targets}, ошибок: {errors}, время анализа: {elapsed:.2f} с")
+    return reports
+
+def collect_corpus_stats(file_path):
+    """
+    Считает частичные накопители статистики целевых столбцов одного файла.
+    
+    Значения читаются потоково (xlsx_patch.iter_column_values), накопители
+    объединяются по целевому столбцу, под каким бы заголовком он ни был найден.
+    
+    Returns:
+        dict: {"file", "error", "columns": {целевой столбец: ColumnStats.to_dict()}}
+    """
+    import corpus_stats
+    import xlsx_patch
+    
+    columns = {}
+    targets = {}
+    
+    def select_columns(sheet_name, headers):
+        entry, _ = resolve_target_columns(headers)
+        targets.update({col: target_col for col, target_col, _ in entry["matches"]})
+        return [col for col, _, _ in entry["matches"]]
+    
+    try:
+        values = xlsx_patch.iter_column_values(
+            file_path, select_columns,
+            select_sheets=lambda names: [name for name in names if sheet_selected(name)],
+        )
+        for _, column, _, cells in values:
+            target_col = targets[column]
+            accumulator = columns.get(target_col)
+            if accumulator is None:
+                accumulator = columns[target_col] = corpus_stats.ColumnStats(STATS_RELATIVE_ACCURACY)
+            for value in cells:
+                if _is_numeric_cell(value):
+                    value = float(value)
+                    # "inf" или "1e400" в текстовой ячейке - не измерение
+                    if math.isfinite(value):
+                        accumulator.add(value)
+    except Exception as e:
+        return {"file": file_path, "error": str(e), "columns": {}}
+    
+    return {"file": file_path, "error": None,
+            "columns": {col: accumulator.to_dict() for col, accumulator in columns.items()}}
+
+def corpus_stats_rows(merged):
+    """
+    Строки отчета по объединенным накопителям в порядке TARGET_COLUMNS.
+    
+    Returns:
+        list: Словари со столбцами отчета (count, min, max, mean, std, квантили,
+              доли значений ниже MIN_VALUE и выше MAX_VALUE)
+    """
+    rows = []
+    for target_col in TARGET_COLUMNS:
+        column = merged.get(target_col)
+        if column is None or not column.stats.count:
+            rows.append({"column": target_col, "count": 0})
+            continue
+        stats = column.stats
+        row = {"column": target_col, "count": stats.count, "min": stats.min, "max": stats.max,
+               "mean": stats.mean, "std": stats.std}
+        for q in STATS_QUANTILES:
+            row[f"p{q * 100:g}"] = column.quantile(q)
+        # Доли значений вне диапазона рандомизации (по наброску квантилей)
+        row["below_min"] = column.sketch.fraction_below(MIN_VALUE)
+        row["above_max"] = 1.0 - column.sketch.fraction_below(MAX_VALUE)
+        rows.append(row)
+    return rows
+
+def write_corpus_stats(rows, output_path):
+    """Записывает отчет в JSON или CSV (по расширению output_path)."""
+    if output_path.lower().endswith(".csv"):
+        import csv
+        
+        fieldnames = []
+        for row in rows:
+            fieldnames.extend(key for key in row if key not in fieldnames)
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({"min_value": MIN_VALUE, "max_value": MAX_VALUE, "columns": rows},
+                      f, ensure_ascii=False, indent=2)
+
+def run_corpus_stats(excel_files, output_path=None, workers=None):
+    """
+    Статистика целевых столбцов по всем файлам за один проход.
+    
+    Рабочие процессы считают частичные накопители по файлам, родительский
+    процесс объединяет их, поэтому значения не хранятся в памяти целиком.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        output_path (str): Файл отчета .json или .csv (необязательно)
+        workers (int): Количество процессов (по умолчанию ANALYZE_WORKERS или число процессоров)
+    
+    Returns:
+        list: Строки отчета (см. corpus_stats_rows)
+    """
+    import time
+    import corpus_stats
+    
+    workers = min(workers or ANALYZE_WORKERS or os.cpu_count() or 1, len(excel_files))
+    print(f"\n📈 СТАТИСТИКА ПО КОРПУСУ - {len(excel_files)} файлов, процессов: {workers}")
+    
+    started = time.perf_counter()
+    if workers <= 1:
+        partials = map(collect_corpus_stats, excel_files)
+        executor = None
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(_current_settings(),))
+        partials = executor.map(collect_corpus_stats, excel_files,
+                                chunksize=max(1, len(excel_files) // (workers * 4)))
+    
+    merged = {}
+    errors = 0
+    try:
+        for partial in partials:
+            if partial["error"]:
+                errors += 1
+                print(f"❌ {partial['file']}: {partial['error']}")
+                continue
+            for target_col, data in partial["columns"].items():
+                column = corpus_stats.ColumnStats.from_dict(data)
+                if target_col in merged:
+                    merged[target_col].merge(column)
+                else:
+                    merged[target_col] = column
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - started
+    
+    rows = corpus_stats_rows(merged)
+    print(f"  {'столбец':<12}{'кол-во':>10}{'min':>10}{'p5':>10}{'p50':>10}{'p95':>10}{'max':>10}{'среднее':>10}{'ст.откл':>10}")
+    for row in rows:
+        if not row["count"]:
+            print(f"  {row['column']:<12}{0:>10}  нет данных")
+            continue
+        print(f"  {row['column']:<12}{row['count']:>10}{row['min']:>10.4f}{row['p5']:>10.4f}{row['p50']:>10.4f}"
+              f"{row['p95']:>10.4f}{row['max']:>10.4f}{row['mean']:>10.4f}{row['std'] or 0:>10.4f}")
+    
+    outside = [row for row in rows if row["count"] and (row["below_min"] or row["above_max"])]
+    for row in outside:
+        print(f"⚠️  {row['column']}: вне диапазона {MIN_VALUE} - {MAX_VALUE}: "
+              f"ниже {row['below_min']:.1%}, выше {row['above_max']:.1%}")
+    print(f"Ошибок: {errors}, время: {elapsed:.2f} с")
+    
+    if output_path:
+        write_corpus_stats(rows, output_path)
+        print(f"✅ Отчет сохранен: {output_path}")
+    return rows
+
+def run_analysis(excel_files, sample_rows=None):
+    """
+    Анализирует файлы без изменений (тестовый режим).
+    
+    Args:
+        excel_files (list): Пути к файлам
+        sample_rows (int): Строк выборки для быстрого анализа; 0 - полный анализ файлов
+    """
+    if sample_rows is None:
+        sample_rows = ANALYZE_SAMPLE_ROWS
+    if sample_rows:
+        run_quick_analysis(excel_files, sample_rows)
+        return
+    
+    print("\n🔍 ТЕСТОВЫЙ РЕЖИМ - анализ файлов без изменений")
+    for i, file_path in enumerate(excel_files, 1):
+        print(f"\n--- Файл {i}/{len(excel_files)} ---")
+        process_excel_file(file_path, test_mode=True)
+
+def run_batch(excel_files, resume=False):
+    """
+    Обрабатывает все файлы и выводит итоги.
+    
+    Args:
+        excel_files (list): Пути к файлам
+        resume (bool): Продолжить незавершенную обработку из журнала
+    
+    Returns:
+        dict: Итоги обработки (см. process_files)
+    """
+    print(f"\n🚀 Начинаем обработку {len(excel_files)} файлов...")
+    
+    with span("batch"):
+        summary = process_files(excel_files, workers=WORKERS, resume=resume)
+    
+    print(f"\n📊 РЕЗУЛЬТАТЫ:")
+    print(f"✅ Успешно обработано: {summary['successful']}")
+    print(f"❌ Ошибок: {summary['failed']}")
+    print(f"⏭️  Пропущено без изменений: {summary['skipped']}")
+    print(f"🗂️  Кеш заголовков: {summary['cache_hits']} попаданий, {summary['cache_misses']} промахов")
+    print_schedule_report(summary)
+    instrumentation.merge(summary.get("timings", {}))
+    instrumentation.print_summary()
+    return summary
+
+def restore_file(name_or_path, target_path=None, overwrite=False):
+    """
+    Восстанавливает исходный файл из хранилища резервных копий.
+    
+    Args:
+        name_or_path (str): Исходный путь или имя файла
+        target_path (str): Куда восстановить (по умолчанию - исходный путь)
+        overwrite (bool): Перезаписать существующий файл
+    
+    Returns:
+        bool: True если файл восстановлен
+    """
+    store = get_backup_store()
+    record = store.find(name_or_path)
+    if record is None:
+        print(f"❌ В хранилище {BACKUP_DIR} нет резервной копии для {name_or_path}")
+        return False
+    
+    target_path = target_path or record["path"]
+    if os.path.exists(target_path) and not overwrite:
+        print(f"❌ Файл {target_path} уже существует (используйте --overwrite)")
+        return False
+    
+    store.restore(record, target_path)
+    print(f"✅ Восстановлен файл: {target_path}")
+    return True
+
+def watch_input_dir(settle=None, interval=None):
+    """
+    Отслеживает INPUT_DIR и обрабатывает новые и измененные файлы по мере появления.
+    
+    Файлы, уже находящиеся в папке, обрабатываются при запуске, если манифест
+    не считает их актуальными. Обработка идет в пуле из WORKERS процессов.
+    Остановка - Ctrl+C.
+    
+    Args:
+        settle (float): Секунд без изменений, после которых файл считается записанным
+        interval (float): Период опроса каталога без inotify
+    
+    Returns:
+        dict: Итоги обработки (см. process_files)
+    """
+    import time
+    
+    import watcher
+    
+    settle = WATCH_SETTLE_SECONDS if settle is None else settle
+    interval = WATCH_POLL_INTERVAL if interval is None else interval
+    
+    create_directories()
+    manifest = ProcessingManifest(os.path.join(OUTPUT_DIR, MANIFEST_FILE))
+    fingerprint = settings_fingerprint()
+    summary = {"successful": 0, "failed": 0, "skipped": 0, "cache_hits": 0, "cache_misses": 0}
+    
+    file_watcher = watcher.create_watcher(INPUT_DIR, ".xlsx", interval)
+    tracker = watcher.SettleTracker(settle)
+    detected = {}
+    
+    def track(paths):
+        now = time.monotonic()
+        for path in paths:
+            detected.setdefault(path, now)
+        tracker.add(paths)
+    
+    track(file_watcher.initial())
+    print(f"👀 Отслеживание папки {INPUT_DIR} ({file_watcher.kind}), процессов: {WORKERS}. Ctrl+C - остановка")
+    
+    pool = _FilePool(WORKERS)
+    last_save = time.monotonic()
+    manifest_dirty = False
+    try:
+        while True:
+            timeout = 0.5 if (len(tracker) or len(pool)) else interval
+            track(file_watcher.wait(timeout))
             
-            toggle_choice = input(f"\nИзменить настройку временных меток? (y/n): ").strip().lower()
-            if toggle_choice in ['y', 'yes', 'д', 'да']:
-                PRESERVE_FILE_DATES = not PRESERVE_FILE_DATES
-                print(f"✅ Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
+            busy = pool.files()
+            for path in tracker.ready():
+                if path in busy:
+                    # Файл изменился во время обработки - обработаем повторно после завершения
+                    tracker.add([path])
+                    continue
+                if not FORCE_REPROCESS and manifest.is_up_to_date(path, fingerprint):
+                    summary["skipped"] += 1
+                    detected.pop(path, None)
+                    continue
+                pool.submit(path)
             
-            # Возвращаемся к главному меню
-            print("\nВозврат к главному меню...")
-            main()
-            return
-                
+            if len(pool):
+                for status in pool.wait(timeout=0):
+                    path = status["file"]
+                    _record_status(summary, status, manifest)
+                    manifest_dirty = manifest_dirty or status["ok"]
+                    latency = time.monotonic() - detected.pop(path, time.monotonic())
+                    mark = "✅" if status["ok"] else "❌"
+                    print(f"{mark} {os.path.basename(path)}: {latency:.1f} с с момента появления")
+            
+            if manifest_dirty and time.monotonic() - last_save > 5:
+                sync_outputs()
+                manifest.save()
+                manifest_dirty = False
+                last_save = time.monotonic()
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Отслеживание остановлено")
+    finally:
+        pool.shutdown()
+        file_watcher.close()
+        sync_outputs()
+        manifest.save()
+    
+    return summary
+
+def _print_header():
+    print("🔧 Скрипт рандомизации значений в Excel файлах")
+    print("=" * 50)
+    print(f"📊 Диапазон значений: {MIN_VALUE} - {MAX_VALUE}")
+    print(f"📅 Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
+    print(f"⚙️  Процессов для обработки: {WORKERS}")
+    print(f"⚙️  Движок обработки: {ENGINE}")
+
+def _settings_menu():
+    """Интерактивное изменение настроек."""
+    global PRESERVE_FILE_DATES, WORKERS, ENGINE
+    
+    # Настройки сохранения временных меток
+    print(f"\n⚙️  НАСТРОЙКИ")
+    print(f"Диапазон значений: {MIN_VALUE} - {MAX_VALUE}")
+    print(f"Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
+    print("\nОпция сохранения временных меток позволяет:")
+    print("- Сохранить дату создания и изменения исходных файлов")
+    print("- Обработанные файлы будут иметь те же временные метки, что и исходные")
+    print("- Полезно для сохранения хронологии данных")
+    
+    toggle_choice = input(f"\nИзменить настройку временных меток? (y/n): ").strip().lower()
+    if toggle_choice in ['y', 'yes', 'д', 'да']:
+        PRESERVE_FILE_DATES = not PRESERVE_FILE_DATES
+        print(f"✅ Сохранение временных меток: {'ВКЛЮЧЕНО' if PRESERVE_FILE_DATES else 'ВЫКЛЮЧЕНО'}")
+    
+    workers_input = input(f"\nКоличество процессов для обработки (сейчас {WORKERS}, Enter - без изменений): ").strip()
+    if workers_input:
+        if workers_input.isdigit() and int(workers_input) > 0:
+            WORKERS = int(workers_input)
+            print(f"✅ Процессов для обработки: {WORKERS}")
         else:
-            print("❌ Неверный выбор!")
+            print("❌ Количество процессов должно быть положительным числом")
+    
+    engine_input = input(f"Движок обработки {'/'.join(ENGINES)} (сейчас {ENGINE}, Enter - без изменений): ").strip().lower()
+    if engine_input:
+        if engine_input in ENGINES:
+            ENGINE = engine_input
+            print(f"✅ Движок обработки: {ENGINE}")
+        else:
+            print(f"❌ Неизвестный движок: {engine_input}")
+
+def main():
+    """Основная функция: интерактивное меню."""
+    configure_instrumentation()
+    
+    while True:
+        _print_header()
+        
+        # Создаем необходимые директории
+        create_directories()
+        
+        # Находим все Excel файлы
+        excel_files = find_excel_files()
+        
+        if not excel_files:
+            print(f"❌ В папке {INPUT_DIR} не найдено Excel файлов!")
+            return
+        
+        print(f"Найдено {len(excel_files)} Excel файлов")
+        
+        # Спрашиваем пользователя о режиме работы
+        print("\nВыберите режим работы:")
+        print("1. Тестовый режим (анализ без изменений)")
+        print("2. Обработка всех файлов")
+        print("3. Обработка одного файла для теста")
+        print("4. Настройки")
+        
+        try:
+            choice = input("Введите номер (1-4): ").strip()
             
+            if choice == "1":
+                # Тестовый режим: быстрый анализ всех файлов по первым строкам
+                run_analysis(excel_files)
+                
+            elif choice == "2":
+                # Обработка всех файлов; предлагаем продолжить прерванную обработку
+                resume = False
+                batch_journal = open_journal()
+                batch = batch_journal.unfinished_batch()
+                batch_journal.close()
+                if batch and batch["remaining"]:
+                    answer = input(f"Найдена прерванная обработка (осталось {batch['remaining']} файлов). Продолжить? (y/n): ")
+                    resume = answer.strip().lower() in ['y', 'yes', 'д', 'да']
+                run_batch(excel_files, resume=resume)
+                
+            elif choice == "3":
+                # Обработка одного файла для теста
+                print(f"\n🧪 Тестовая обработка первого файла: {excel_files[0]}")
+                if process_excel_file(excel_files[0]):
+                    sync_outputs()
+                    print("✅ Тестовая обработка завершена успешно!")
+                else:
+                    print("❌ Ошибка при тестовой обработке")
+                    
+            elif choice == "4":
+                _settings_menu()
+                
+                # Возвращаемся к главному меню
+                print("\nВозврат к главному меню...")
+                continue
+                    
+            else:
+                print("❌ Неверный выбор!")
+                
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Операция прервана пользователем")
+        except Exception as e:
+            print(f"\n❌ Неожиданная ошибка: {str(e)}")
+        return
+
+def build_parser():
+    """Создает парсер аргументов командной строки."""
+    import argparse
+    
+    # Общие параметры допускаются и до, и после команды; SUPPRESS не дает
+    # значениям по умолчанию подкоманды затереть значения, указанные до нее
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--input-dir", default=argparse.SUPPRESS, help=f"папка с исходными файлами (по умолчанию {INPUT_DIR})")
+    common.add_argument("--output-dir", default=argparse.SUPPRESS, help=f"папка для обработанных файлов (по умолчанию {OUTPUT_DIR})")
+    common.add_argument("--backup-dir", default=argparse.SUPPRESS, help=f"папка хранилища резервных копий (по умолчанию {BACKUP_DIR})")
+    common.add_argument("--min", dest="min_value", type=float, default=argparse.SUPPRESS, help=f"нижняя граница значений (по умолчанию {MIN_VALUE})")
+    common.add_argument("--max", dest="max_value", type=float, default=argparse.SUPPRESS, help=f"верхняя граница значений (по умолчанию {MAX_VALUE})")
+    common.add_argument("--workers", type=int, default=argparse.SUPPRESS, help=f"количество процессов (по умолчанию {WORKERS})")
+    common.add_argument("--engine", choices=ENGINES, default=argparse.SUPPRESS, help=f"движок обработки (по умолчанию {ENGINE})")
+    common.add_argument("--sheets", dest="sheet_pattern", default=argparse.SUPPRESS, help=f"шаблон имен обрабатываемых листов (по умолчанию \"{SHEET_PATTERN}\")")
+    common.add_argument("--seed", type=int, default=argparse.SUPPRESS, help="начальное значение генератора для воспроизводимого результата")
+    common.add_argument("--preserve-timestamps", dest="preserve_timestamps", action="store_true", default=argparse.SUPPRESS, help="сохранять временные метки исходных файлов")
+    common.add_argument("--no-preserve-timestamps", dest="preserve_timestamps", action="store_false", default=argparse.SUPPRESS, help="не сохранять временные метки")
+    common.add_argument("--timings", action="store_true", default=argparse.SUPPRESS, help="вывести время этапов после обработки")
+    common.add_argument("--timings-file", default=argparse.SUPPRESS, help="файл JSON lines для записей о времени этапов")
+    common.add_argument("--pipeline", action="store_true", default=argparse.SUPPRESS, help="конвейерная обработка: чтение, рандомизация и запись одновременно")
+    common.add_argument("--pipeline-workbooks", type=int, default=argparse.SUPPRESS, help=f"книг в работе при конвейерной обработке (по умолчанию {PIPELINE_MAX_WORKBOOKS})")
+    common.add_argument("--pipeline-mb", type=float, default=argparse.SUPPRESS, help="предел объема исходных файлов в работе при конвейерной обработке, МБ")
+    common.add_argument("--no-progress", dest="progress", action="store_false", default=argparse.SUPPRESS, help="не выводить строку хода обработки")
+    common.add_argument("--backup-strategy", choices=backup_store.BACKUP_STRATEGIES, default=argparse.SUPPRESS, help=f"способ создания резервных копий (по умолчанию {BACKUP_STRATEGY})")
+    common.add_argument("--backup-compress", dest="backup_compress", action="store_true", default=argparse.SUPPRESS, help="сжимать резервные копии gzip")
+    common.add_argument("--no-backup-compress", dest="backup_compress", action="store_false", default=argparse.SUPPRESS, help="хранить резервные копии без сжатия (по умолчанию)")
+    common.add_argument("--fsync", choices=FSYNC_MODES, default=argparse.SUPPRESS, help=f"сброс результатов на диск (по умолчанию {FSYNC_MODE})")
+    
+    parser = argparse.ArgumentParser(
+        prog="randomize_excel_values.py",
+        description="Рандомизация значений в Excel файлах. Без команды запускается интерактивное меню.",
+        parents=[common],
+    )
+    parser.add_argument("--force", action="store_true", default=argparse.SUPPRESS, help="обработать все файлы, игнорируя манифест")
+    commands = parser.add_subparsers(dest="command", metavar="команда")
+    
+    analyze = commands.add_parser("analyze", parents=[common], help="анализ файлов без изменений")
+    analyze.add_argument("files", nargs="*", help="файлы для анализа (по умолчанию все из --input-dir)")
+    analyze.add_argument("--sample", type=int, default=ANALYZE_SAMPLE_ROWS,
+                         help=f"строк выборки на лист, 0 - полный анализ (по умолчанию {ANALYZE_SAMPLE_ROWS})")
+    
+    stats = commands.add_parser("stats", parents=[common], help="статистика целевых столбцов по всем файлам")
+    stats.add_argument("files", nargs="*", help="файлы (по умолчанию все из --input-dir)")
+    stats.add_argument("--output", help="файл отчета .json или .csv")
+    
+    run = commands.add_parser("run", parents=[common], help="обработка всех файлов")
+    run.add_argument("--force", action="store_true", default=argparse.SUPPRESS, help="обработать все файлы, игнорируя манифест")
+    run.add_argument("--resume", action="store_true", help="продолжить прерванную обработку из журнала")
+    
+    run_one = commands.add_parser("run-one", parents=[common], help="обработка одного файла")
+    run_one.add_argument("file", help="путь к файлу")
+    
+    watch = commands.add_parser("watch", parents=[common], help="отслеживание новых файлов в --input-dir")
+    watch.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                       help=f"секунд без изменений до обработки файла (по умолчанию {WATCH_SETTLE_SECONDS})")
+    watch.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL,
+                       help=f"период опроса без inotify, сек (по умолчанию {WATCH_POLL_INTERVAL})")
+    watch.add_argument("--force", action="store_true", default=argparse.SUPPRESS, help="обрабатывать файлы, игнорируя манифест")
+    
+    restore = commands.add_parser("restore", parents=[common], help="восстановление файла из резервной копии")
+    restore.add_argument("file", help="исходный путь или имя файла")
+    restore.add_argument("--to", dest="target", help="куда восстановить (по умолчанию - исходный путь)")
+    restore.add_argument("--overwrite", action="store_true", help="перезаписать существующий файл")
+    
+    return parser
+
+def apply_arguments(args):
+    """Переносит параметры командной строки в настройки модуля."""
+    options = {
+        "input_dir": "INPUT_DIR",
+        "output_dir": "OUTPUT_DIR",
+        "backup_dir": "BACKUP_DIR",
+        "backup_strategy": "BACKUP_STRATEGY",
+        "backup_compress": "BACKUP_COMPRESS",
+        "min_value": "MIN_VALUE",
+        "max_value": "MAX_VALUE",
+        "workers": "WORKERS",
+        "engine": "ENGINE",
+        "sheet_pattern": "SHEET_PATTERN",
+        "seed": "SEED",
+        "preserve_timestamps": "PRESERVE_FILE_DATES",
+        "timings": "TIMINGS",
+        "timings_file": "TIMINGS_FILE",
+        "fsync": "FSYNC_MODE",
+        "progress": "PROGRESS",
+        "pipeline": "PIPELINE",
+        "pipeline_workbooks": "PIPELINE_MAX_WORKBOOKS",
+        "pipeline_mb": "PIPELINE_MAX_MB",
+        "force": "FORCE_REPROCESS",
+    }
+    for option, setting in options.items():
+        if hasattr(args, option):
+            globals()[setting] = getattr(args, option)
+
+def cli(argv=None):
+    """
+    Точка входа командной строки.
+    
+    Returns:
+        int: Код завершения процесса
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    apply_arguments(args)
+    
+    if MIN_VALUE > MAX_VALUE:
+        parser.error(f"--min ({MIN_VALUE}) больше --max ({MAX_VALUE})")
+    if WORKERS < 1:
+        parser.error("--workers должно быть положительным числом")
+    if SEED is not None and SEED < 0:
+        parser.error("--seed должно быть неотрицательным числом")
+    
+    if args.command is None:
+        main()
+        return 0
+    
+    configure_instrumentation()
+    try:
+        if args.command == "restore":
+            return 0 if restore_file(args.file, args.target, args.overwrite) else 1
+        
+        if args.command == "watch":
+            watch_input_dir(args.settle, args.interval)
+            return 0
+        
+        if args.command == "run-one":
+            create_directories()
+            if not process_excel_file(args.file):
+                return 1
+            sync_outputs()
+            return 0
+        
+        excel_files = getattr(args, "files", None) or find_excel_files()
+        if not excel_files:
+            print(f"❌ В папке {INPUT_DIR} не найдено Excel файлов!")
+            return 1
+        
+        if args.command == "analyze":
+            run_analysis(excel_files, args.sample)
+            return 0
+        
+        if args.command == "stats":
+            run_corpus_stats(excel_files, args.output)
+            return 0
+        
+        create_directories()
+        summary = run_batch(excel_files, resume=args.resume)
+        return 1 if summary["failed"] else 0
     except KeyboardInterrupt:
         print("\n\n⏹️  Операция прервана пользователем")
-    except Exception as e:
-        print(f"\n❌ Неожиданная ошибка: {str(e)}")
+        return 130
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
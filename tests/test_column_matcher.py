@@ -0,0 +1,45 @@
+import pytest
+
+from randomize_excel_values import TARGET_COLUMNS, ColumnMatcher
+
+
+@pytest.fixture
+def matcher():
+    return ColumnMatcher(TARGET_COLUMNS)
+
+
+def test_exact_match(matcher):
+    assert matcher.match(["№", "МЗ 1/60", "Примечание"]) == [("МЗ 1/60", "МЗ 1/60", "exact")]
+
+
+def test_normalized_match_ignores_spaces_and_case(matcher):
+    assert matcher.match([" мз3/40 ", "уз 3/60"]) == [
+        ("уз 3/60", "УЗ 3/60", "normalized"),
+        (" мз3/40 ", "МЗ 3/40", "normalized"),
+    ]
+
+
+def test_fuzzy_match_inside_longer_header(matcher):
+    assert matcher.match(["Дата", "МЗ 2/60, мкА"]) == [("МЗ 2/60, мкА", "МЗ 2/60", "fuzzy")]
+
+
+@pytest.mark.parametrize("header", ["МЗ 1/600", "МЗ 11/60", "МЗ 1/60 0", "МЗ 1/600, мкА"])
+def test_target_inside_larger_number_is_rejected(matcher, header):
+    # Пробелы не учитываются, поэтому "МЗ 1/60 0" - это тоже "МЗ 1/600"
+    assert matcher.match([header]) == []
+
+
+def test_column_is_matched_once(matcher):
+    matches = matcher.match(["МЗ 1/60", "МЗ 1/60", "мз 1/60", "МЗ 1/60 (резерв)"])
+
+    assert matches == [("МЗ 1/60", "МЗ 1/60", "exact"), ("мз 1/60", "МЗ 1/60", "normalized")]
+    columns = [col for col, _, _ in matcher.match(["МЗ 2/40", " МЗ 2/40", "МЗ 2/40 ср."] * 2)]
+    assert len(columns) == len(set(columns))
+
+
+def test_matches_follow_target_order_then_file_order(matcher):
+    matches = matcher.match(["МЗ 1/40", "x", "МЗ 1/60", "мз1/60"])
+
+    assert [(col, rule) for col, _, rule in matches] == [
+        ("МЗ 1/60", "exact"), ("мз1/60", "normalized"), ("МЗ 1/40", "exact"),
+    ]
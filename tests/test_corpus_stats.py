@@ -0,0 +1,69 @@
+import json
+import math
+import random
+
+import pytest
+
+from corpus_stats import ColumnStats, QuantileSketch, RunningStats
+
+
+def sample(n=20000, seed=1):
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(3, 1.5) for _ in range(n)]
+    values += [-rng.uniform(0.001, 50) for _ in range(n // 10)] + [0.0] * 25
+    rng.shuffle(values)
+    return values
+
+
+def test_merged_partials_match_single_pass():
+    values = sample()
+    single = ColumnStats()
+    for value in values:
+        single.add(value)
+
+    # Части разного размера, в том числе пустая, как у файлов без значений
+    bounds = [0, 1, 1, 5000, 13001, len(values)]
+    merged = ColumnStats()
+    for start, end in zip(bounds, bounds[1:]):
+        part = ColumnStats()
+        for value in values[start:end]:
+            part.add(value)
+        # Частичные накопители передаются из рабочих процессов в виде JSON
+        merged.merge(ColumnStats.from_dict(json.loads(json.dumps(part.to_dict()))))
+
+    assert merged.stats.count == single.stats.count == len(values)
+    assert (merged.stats.min, merged.stats.max) == (min(values), max(values))
+    assert merged.stats.mean == pytest.approx(single.stats.mean, rel=1e-12)
+    assert merged.stats.variance == pytest.approx(single.stats.variance, rel=1e-9)
+    assert merged.stats.mean == pytest.approx(math.fsum(values) / len(values), rel=1e-12)
+    assert merged.sketch.to_dict() == single.sketch.to_dict()
+
+
+def test_running_stats_matches_two_pass_variance():
+    values = [1e9 + x for x in (4.0, 7.0, 13.0, 16.0)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.variance == pytest.approx(30.0, rel=1e-9)
+    assert RunningStats().variance is None
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.01, 0.001])
+def test_quantile_relative_error_is_bounded(relative_accuracy):
+    values = sample()
+    sketch = QuantileSketch(relative_accuracy)
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+
+    for q in [i / 200 for i in range(201)]:
+        exact = ordered[int(q * (len(ordered) - 1))]
+        estimate = sketch.quantile(q)
+        assert abs(estimate - exact) <= relative_accuracy * abs(exact) * (1 + 1e-9), (q, exact, estimate)
+
+
+def test_empty_sketch_and_mismatched_accuracy():
+    assert QuantileSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.001))
@@ -0,0 +1,76 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import randomize_excel_values as rev
+
+
+@pytest.fixture
+def configured(tmp_path, monkeypatch):
+    """Направляет результаты и резервные копии во временный каталог."""
+    for setting, name in (("OUTPUT_DIR", "output"), ("BACKUP_DIR", "backup")):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(rev, setting, str(tmp_path / name))
+    monkeypatch.setattr(rev, "SEED", 7)
+    return tmp_path
+
+
+def make_workbook(path):
+    workbook = Workbook()
+    stand = workbook.active
+    stand.title = "Стенд1"
+    stand.append(["№", None, "МЗ 1/60", "Примечание", "МЗ 2/60"])
+    for i in range(1, 31):
+        stand.append([i, "x", 20.0 + i / 10, f"строка {i}", str(21.0 + i / 100) if i % 3 else None])
+    # Лист без целевых столбцов, подходящий под шаблон
+    plain = workbook.create_sheet("Стенд2")
+    plain.append(["A", "A", None])
+    plain.append([1, 2, 3])
+    # Лист, не подходящий под шаблон, с целевым столбцом
+    info = workbook.create_sheet("Инфо")
+    info.append(["МЗ 1/60", None, "МЗ 1/60"])
+    info.append([5, "b", 6])
+    workbook.save(path)
+    return path
+
+
+def cells(path):
+    workbook = load_workbook(path)
+    return {sheet.title: [[cell.value for cell in row] for row in sheet.iter_rows()] for sheet in workbook.worksheets}
+
+
+def test_pandas_engine_keeps_unprocessed_sheets_and_headers(configured, monkeypatch):
+    monkeypatch.setattr(rev, "ENGINE", "pandas")
+    monkeypatch.setattr(rev, "SHEET_PATTERN", "Стенд*")
+    source = make_workbook(configured / "in.xlsx")
+
+    assert rev.process_excel_file(str(source))
+
+    before, after = cells(source), cells(configured / "output" / "in.xlsx")
+    assert after["Стенд2"] == before["Стенд2"]
+    assert after["Инфо"] == before["Инфо"]
+    assert after["Стенд1"][0] == before["Стенд1"][0]
+    changed = [row[2] for row in after["Стенд1"][1:]]
+    assert changed != [row[2] for row in before["Стенд1"][1:]]
+    assert all(rev.MIN_VALUE <= value <= rev.MAX_VALUE for value in changed)
+    # Текстовый столбец не изменяется
+    assert [row[3] for row in after["Стенд1"]] == [row[3] for row in before["Стенд1"]]
+
+
+def run_batch(configured, monkeypatch, files, engine, workers):
+    output = configured / f"output-{engine}-{workers}"
+    output.mkdir()
+    monkeypatch.setattr(rev, "OUTPUT_DIR", str(output))
+    monkeypatch.setattr(rev, "ENGINE", engine)
+    summary = rev.process_files([str(path) for path in files], workers=workers, force=True)
+    assert summary["successful"] == len(files)
+    return {path.name: cells(output / path.name) for path in files}
+
+
+def test_seeded_output_is_identical_for_engines_and_workers(configured, monkeypatch):
+    monkeypatch.setattr(rev, "PROGRESS", False)
+    monkeypatch.setattr(rev, "SHEET_PATTERN", "Стенд*")
+    files = [make_workbook(configured / f"in{i}.xlsx") for i in range(3)]
+
+    expected = run_batch(configured, monkeypatch, files, "pandas", 1)
+    for engine, workers in (("stream", 1), ("patch", 1), ("pandas", 2), ("patch", 2)):
+        assert run_batch(configured, monkeypatch, files, engine, workers) == expected, (engine, workers)
@@ -0,0 +1,208 @@
+import io
+import itertools
+import os
+import struct
+import zipfile
+
+import pytest
+
+import xlsx_patch
+
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="xml" ContentType="application/xml"/></Types>'
+)
+WORKBOOK = (
+    f'<workbook xmlns="{_NS}" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Стенд1" sheetId="1" r:id="rId1"/><sheet name="Инфо" sheetId="2" r:id="rId2"/></sheets>'
+    '<calcPr calcId="191029"/></workbook>'
+)
+WORKBOOK_RELS = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="worksheet" Target="worksheets/sheet2.xml"/>'
+    '</Relationships>'
+)
+SHARED_STRINGS = (
+    f'<sst xmlns="{_NS}"><si><t>№</t></si><si><t>МЗ 1/60</t></si><si><t>22.5</t></si></sst>'
+)
+SHEET = (
+    f'<worksheet xmlns="{_NS}"><sheetData>'
+    '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c>'
+    '<c r="C1" t="inlineStr"><is><t>МЗ 2/60</t></is></c></row>'
+    '<row r="2"><c r="A2"><v>1</v></c><c r="B2"><v>20.5</v></c><c r="C2" t="s"><v>2</v></c></row>'
+    '<row r="3"><c r="A3"><v>2</v></c><c r="B3" t="inlineStr"><is><t>21.25</t></is></c>'
+    '<c r="C3"><f>B2*2</f><v>41</v></c></row>'
+    '<row r="4"><c><v>3</v></c><c><v>7.5</v></c><c r="C4" t="b"><v>1</v></c></row>'
+    '</sheetData></worksheet>'
+)
+OTHER_SHEET = f'<worksheet xmlns="{_NS}"><sheetData><row r="1"><c r="A1"><v>5</v></c></row></sheetData></worksheet>'
+# Несжимаемые данные, как у изображений в отчетах
+MEDIA = os.urandom(50000)
+
+
+class _Unseekable:
+    """Поток без seek/tell: zipfile пишет в него элементы с дескрипторами данных."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+
+def make_workbook(path, data_descriptors=False):
+    members = [
+        ("[Content_Types].xml", CONTENT_TYPES, zipfile.ZIP_DEFLATED),
+        ("xl/workbook.xml", WORKBOOK, zipfile.ZIP_DEFLATED),
+        ("xl/_rels/workbook.xml.rels", WORKBOOK_RELS, zipfile.ZIP_DEFLATED),
+        ("xl/sharedStrings.xml", SHARED_STRINGS, zipfile.ZIP_DEFLATED),
+        ("xl/worksheets/sheet1.xml", SHEET, zipfile.ZIP_DEFLATED),
+        ("xl/worksheets/sheet2.xml", OTHER_SHEET, zipfile.ZIP_DEFLATED),
+        ("xl/media/image1.png", MEDIA, zipfile.ZIP_STORED),
+    ]
+    stream = _Unseekable() if data_descriptors else open(path, "wb")
+    with zipfile.ZipFile(stream, "w") as archive:
+        for name, data, method in members:
+            archive.writestr(name, data, compress_type=method)
+    if data_descriptors:
+        with open(path, "wb") as f:
+            f.write(stream.buffer.getvalue())
+    else:
+        stream.close()
+    return path
+
+
+def patch(source, target, sheets=None):
+    values = itertools.count(100.5)
+    return xlsx_patch.patch_workbook(
+        source, target,
+        select_columns=lambda sheet, headers: [h for h in headers if h.startswith("МЗ")],
+        next_value=lambda sheet, column: next(values),
+        select_sheets=sheets,
+    )
+
+
+def raw_data(path, info):
+    """Сжатые байты элемента архива."""
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        name_length, extra_length = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        return f.read(info.compress_size)
+
+
+def sheet_xml(path, member="xl/worksheets/sheet1.xml"):
+    with zipfile.ZipFile(path) as archive:
+        return archive.read(member)
+
+
+def test_numbers_stored_as_shared_and_inline_strings_are_converted(tmp_path):
+    source = make_workbook(tmp_path / "in.xlsx")
+    results = patch(source, tmp_path / "out.xlsx")
+
+    assert results == [("Стенд1", ["№", "МЗ 1/60", "МЗ 2/60"], {"МЗ 1/60": 2, "МЗ 2/60": 1})]
+    xml = sheet_xml(tmp_path / "out.xlsx")
+    assert b'<c r="B2"><v>100.5</v></c>' in xml
+    assert b'<c r="C2"><v>101.5</v></c>' in xml
+    assert b'<c r="B3"><v>102.5</v></c>' in xml
+
+
+def test_formulas_cells_without_ref_and_booleans_are_left_alone(tmp_path):
+    source = make_workbook(tmp_path / "in.xlsx")
+    patch(source, tmp_path / "out.xlsx")
+
+    xml = sheet_xml(tmp_path / "out.xlsx")
+    assert b'<c r="C3"><f>B2*2</f><v>41</v></c>' in xml
+    assert b'<row r="4"><c><v>3</v></c><c><v>7.5</v></c><c r="C4" t="b"><v>1</v></c></row>' in xml
+    # Ячейки вне целевых столбцов и заголовки не меняются
+    assert b'<c r="A2"><v>1</v></c>' in xml
+    assert b'<c r="B1" t="s"><v>1</v></c>' in xml
+
+
+@pytest.mark.parametrize("data_descriptors", [False, True])
+def test_untouched_members_are_copied_raw(tmp_path, data_descriptors):
+    source = make_workbook(tmp_path / "in.xlsx", data_descriptors)
+    target = tmp_path / "out.xlsx"
+    with zipfile.ZipFile(source) as archive:
+        source_infos = {info.filename: info for info in archive.infolist()}
+    assert all(info.flag_bits & 0x08 for info in source_infos.values()) == data_descriptors
+
+    patch(source, target, sheets=lambda names: ["Стенд1"])
+
+    with zipfile.ZipFile(target) as archive:
+        assert archive.testzip() is None
+        infos = archive.infolist()
+        assert [info.filename for info in infos] == list(source_infos)
+        for info in infos:
+            assert not info.flag_bits & 0x08
+            if info.filename in ("xl/worksheets/sheet1.xml", "xl/workbook.xml"):
+                continue
+            original = source_infos[info.filename]
+            assert (info.CRC, info.compress_type, info.compress_size) == \
+                (original.CRC, original.compress_type, original.compress_size)
+            assert raw_data(target, info) == raw_data(source, original)
+        assert archive.read("xl/media/image1.png") == MEDIA
+
+
+def test_workbook_recalculates_formulas_on_load(tmp_path):
+    source = make_workbook(tmp_path / "in.xlsx")
+    patch(source, tmp_path / "out.xlsx")
+
+    assert b'<calcPr calcId="191029" fullCalcOnLoad="1"/>' in sheet_xml(tmp_path / "out.xlsx", "xl/workbook.xml")
+
+
+def test_full_calc_on_load_is_added_before_later_elements():
+    xml = b'<x:workbook xmlns:x="m"><x:sheets/><x:definedNames/><x:extLst/></x:workbook>'
+    assert xlsx_patch.full_calc_on_load(xml) == \
+        b'<x:workbook xmlns:x="m"><x:sheets/><x:definedNames/><x:calcPr fullCalcOnLoad="1"/><x:extLst/></x:workbook>'
+    xml = b'<workbook><calcPr calcId="1" fullCalcOnLoad="0"/></workbook>'
+    assert xlsx_patch.full_calc_on_load(xml) == b'<workbook><calcPr calcId="1" fullCalcOnLoad="1"/></workbook>'
+
+
+def test_zip64_fallback_produces_same_cells(tmp_path, monkeypatch):
+    source = make_workbook(tmp_path / "in.xlsx")
+    patch(source, tmp_path / "raw.xlsx")
+    monkeypatch.setattr(xlsx_patch, "_needs_zip64", lambda archive, path: True)
+    results = patch(source, tmp_path / "zip64.xlsx")
+
+    assert results[0][2] == {"МЗ 1/60": 2, "МЗ 2/60": 1}
+    with zipfile.ZipFile(tmp_path / "zip64.xlsx") as archive, zipfile.ZipFile(tmp_path / "raw.xlsx") as raw:
+        assert archive.testzip() is None
+        assert archive.namelist() == raw.namelist()
+        for name in archive.namelist():
+            assert archive.read(name) == raw.read(name)
+
+
+def test_small_chunks_split_rows_between_reads(tmp_path):
+    source = make_workbook(tmp_path / "in.xlsx")
+    output = io.BytesIO()
+    with zipfile.ZipFile(source) as archive, archive.open("xl/worksheets/sheet1.xml") as stream:
+        values = itertools.count(100.5)
+        headers, counts = xlsx_patch.patch_sheet(
+            stream, output.write, xlsx_patch.SharedStrings(archive),
+            lambda headers: ["МЗ 1/60", "МЗ 2/60"], lambda column: next(values), chunk_size=7,
+        )
+
+    assert headers == ["№", "МЗ 1/60", "МЗ 2/60"]
+    assert counts == {"МЗ 1/60": 2, "МЗ 2/60": 1}
+    xml = output.getvalue()
+    assert b'<c r="B2"><v>100.5</v></c>' in xml
+    assert b'<c r="B3"><v>102.5</v></c>' in xml
+    assert b'<c r="C3"><f>B2*2</f><v>41</v></c>' in xml
+    # Строка заголовков и все до нее переносятся без изменений
+    assert xml.startswith(SHEET[:SHEET.index('<row r="2">')].encode("utf-8"))
+
+
+def test_sample_rows_are_typed(tmp_path):
+    source = make_workbook(tmp_path / "in.xlsx")
+    [(name, headers, rows)] = xlsx_patch.read_sample(source, select_sheets=lambda names: names[:1])
+
+    assert (name, headers) == ("Стенд1", ["№", "МЗ 1/60", "МЗ 2/60"])
+    assert rows == [[1.0, 20.5, "22.5"], [2.0, "21.25", 41.0], [3.0, 7.5, True]]
@@ -0,0 +1,177 @@
+"""
+Отслеживание новых и измененных файлов в каталоге.
+
+На Linux используется inotify (через ctypes, без сторонних библиотек),
+на остальных системах - опрос каталога через os.scandir с сравнением
+размера и времени изменения.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+# Флаги inotify (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _matches(name, suffix):
+    # ~$file.xlsx - файлы блокировки Excel
+    return name.lower().endswith(suffix) and not name.startswith("~$")
+
+
+class PollingWatcher:
+    """Отслеживание изменений опросом каталога через os.scandir."""
+
+    kind = "polling"
+
+    def __init__(self, directory, suffix=".xlsx", interval=2.0):
+        self.directory = directory
+        self.suffix = suffix
+        self.interval = interval
+        self._snapshot = {}
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if _matches(entry.name, self.suffix) and entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def initial(self):
+        """Возвращает файлы, уже находящиеся в каталоге."""
+        self._snapshot = self._scan()
+        return set(self._snapshot)
+
+    def wait(self, timeout):
+        """Ждет до timeout секунд и возвращает пути новых или измененных файлов."""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Отслеживание изменений через inotify (только Linux)."""
+
+    kind = "inotify"
+
+    def __init__(self, directory, suffix=".xlsx"):
+        self.directory = directory
+        self.suffix = suffix
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def initial(self):
+        """Возвращает файлы, уже находящиеся в каталоге."""
+        with os.scandir(self.directory) as entries:
+            return {entry.path for entry in entries if _matches(entry.name, self.suffix) and entry.is_file()}
+
+    def wait(self, timeout):
+        """Ждет событий до timeout секунд и возвращает пути новых или измененных файлов."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                start = offset + _EVENT_HEADER.size
+                name = data[start:start + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                offset = start + length
+                if _matches(name, self.suffix):
+                    changed.add(os.path.join(self.directory, name))
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def create_watcher(directory, suffix=".xlsx", interval=2.0):
+    """
+    Создает наблюдатель за каталогом: inotify, если доступен, иначе опрос.
+
+    Args:
+        directory (str): Каталог
+        suffix (str): Расширение отслеживаемых файлов
+        interval (float): Период опроса для PollingWatcher (сек)
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory, suffix)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directory, suffix, interval)
+
+
+class SettleTracker:
+    """
+    Отбирает файлы, размер и время изменения которых не менялись заданное время.
+
+    Файл, который еще дописывается, не отдается на обработку, пока запись не
+    прекратится на settle секунд.
+    """
+
+    def __init__(self, settle=2.0):
+        self.settle = settle
+        self._pending = {}
+
+    def add(self, paths):
+        """Добавляет файлы для ожидания окончания записи."""
+        now = time.monotonic()
+        for path in paths:
+            self._pending[path] = (None, now)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def ready(self):
+        """Возвращает файлы, запись которых завершилась, и убирает их из ожидания."""
+        now = time.monotonic()
+        done = []
+        for path, (state, since) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != state:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle:
+                del self._pending[path]
+                done.append(path)
+        return done
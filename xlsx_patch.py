@@ -0,0 +1,703 @@
+"""
+Прямое изменение значений ячеек в .xlsx файлах без загрузки книги в pandas.
+
+Книга открывается как zip архив, XML выбранных листов читается потоково блоками,
+переписываются только элементы <v> ячеек в выбранных столбцах.
+Все остальные части архива (стили, другие листы, изображения) копируются без изменений
+в уже сжатом виде, заново сжимаются только измененные XML листов и xl/workbook.xml,
+в котором включается пересчет формул при открытии книги.
+"""
+
+import html
+import os
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+# Пространства имен SpreadsheetML
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Размер блока при потоковом чтении XML листа
+CHUNK_SIZE = 1 << 20
+# Размер блока при чтении выборки строк: чтение останавливается вскоре после нужной строки
+SAMPLE_CHUNK_SIZE = 1 << 16
+
+_ROW_END = b"</row>"
+_ROW_RE = re.compile(rb"<row\b(?:[^>/]|/(?!>))*>(.*?)</row>", re.S)
+_CELL_RE = re.compile(rb"<c\b((?:[^>/]|/(?!>))*)(?:/>|>(.*?)</c>)", re.S)
+_REF_RE = re.compile(rb'\br="([A-Z]+)([0-9]+)"')
+_TYPE_RE = re.compile(rb'\st="([a-zA-Z]+)"')
+_VALUE_RE = re.compile(rb"<v>(.*?)</v>", re.S)
+_TEXT_RE = re.compile(rb"<t\b[^>]*>(.*?)</t>", re.S)
+_FORMULA_RE = re.compile(rb"<f\b")
+_CALC_PR_RE = re.compile(rb"<((?:[\w.-]+:)?)calcPr\b((?:[^>/]|/(?!>))*)(/?>)")
+_FULL_CALC_RE = re.compile(rb'\sfullCalcOnLoad="[^"]*"')
+_WORKBOOK_RE = re.compile(rb"<((?:[\w.-]+:)?)workbook\b")
+
+_WORKBOOK_PATH = "xl/workbook.xml"
+# Элементы книги, следующие в схеме за calcPr (перед первым из них вставляется новый calcPr)
+_AFTER_CALC_PR = (b"oleSize", b"customWorkbookViews", b"pivotCaches", b"smartTagPr", b"smartTagTypes",
+                  b"webPublishing", b"fileRecoveryPr", b"webPublishObjects", b"extLst")
+
+# Сигнатуры и форматы записей zip архива
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_LOCAL_SIGNATURE = 0x04034B50
+_CENTRAL_SIGNATURE = 0x02014B50
+_END_SIGNATURE = 0x06054B50
+_ZIP32_LIMIT = 0xFFFFFFFF
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_COPY_BLOCK = 1 << 20
+
+
+def column_index(letters):
+    """Преобразует буквенное обозначение столбца (A, B, ..., AA) в индекс с нуля."""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def column_letters(index):
+    """Преобразует индекс столбца с нуля в буквенное обозначение."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def workbook_sheets(archive):
+    """
+    Возвращает листы книги в порядке следования.
+
+    Args:
+        archive (zipfile.ZipFile): Открытый архив книги
+
+    Returns:
+        list: Пары (имя листа, путь к XML листа внутри архива)
+    """
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{_NS_PKG_REL}}}Relationship")}
+
+    sheets = []
+    for sheet in workbook.iter(f"{{{_NS_MAIN}}}sheet"):
+        target = targets[sheet.get(f"{{{_NS_REL}}}id")]
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join("xl", target))
+        sheets.append((sheet.get("name"), path))
+    return sheets
+
+
+class SharedStrings:
+    """
+    Ленивая таблица общих строк (xl/sharedStrings.xml).
+
+    Строки разбираются только до нужного индекса, поэтому для чтения заголовков
+    не требуется разбирать всю таблицу.
+    """
+
+    def __init__(self, archive):
+        self._strings = []
+        self._items = None
+        if "xl/sharedStrings.xml" in archive.namelist():
+            self._items = self._iter_items(archive.open("xl/sharedStrings.xml"))
+
+    @staticmethod
+    def _iter_items(stream):
+        si_tag = f"{{{_NS_MAIN}}}si"
+        t_tag = f"{{{_NS_MAIN}}}t"
+        rph_tag = f"{{{_NS_MAIN}}}rPh"
+        with stream:
+            for _, element in ElementTree.iterparse(stream):
+                if element.tag == si_tag:
+                    # Фонетические подсказки (rPh) не входят в текст ячейки
+                    phonetic = {id(t) for rph in element.iter(rph_tag) for t in rph.iter(t_tag)}
+                    yield "".join(t.text or "" for t in element.iter(t_tag) if id(t) not in phonetic)
+                    element.clear()
+
+    def get(self, index):
+        """Возвращает строку по индексу или пустую строку, если индекса нет."""
+        while index >= len(self._strings) and self._items is not None:
+            try:
+                self._strings.append(next(self._items))
+            except StopIteration:
+                self._items = None
+        if index < len(self._strings):
+            return self._strings[index]
+        return ""
+
+
+def full_calc_on_load(workbook_xml):
+    """
+    Включает пересчет всех формул при открытии книги (calcPr fullCalcOnLoad="1").
+
+    Сохраненные в ячейках результаты формул после замены значений устаревают,
+    Excel и LibreOffice пересчитывают их при открытии книги с этим признаком.
+
+    Args:
+        workbook_xml (bytes): Содержимое xl/workbook.xml
+
+    Returns:
+        bytes: Измененное содержимое
+    """
+    calc_pr = _CALC_PR_RE.search(workbook_xml)
+    if calc_pr is not None:
+        attrs = _FULL_CALC_RE.sub(b"", calc_pr.group(2)).rstrip()
+        element = b"<" + calc_pr.group(1) + b"calcPr" + attrs + b' fullCalcOnLoad="1"' + calc_pr.group(3)
+        return workbook_xml[:calc_pr.start()] + element + workbook_xml[calc_pr.end():]
+
+    root = _WORKBOOK_RE.search(workbook_xml)
+    prefix = root.group(1) if root else b""
+    insert_at = workbook_xml.rfind(b"</" + prefix + b"workbook>")
+    for name in _AFTER_CALC_PR:
+        position = workbook_xml.find(b"<" + prefix + name)
+        if position != -1:
+            insert_at = min(insert_at, position) if insert_at != -1 else position
+    if insert_at == -1:
+        return workbook_xml
+    return workbook_xml[:insert_at] + b"<" + prefix + b'calcPr fullCalcOnLoad="1"/>' + workbook_xml[insert_at:]
+
+
+def _cell_text(attrs, body, shared_strings):
+    """
+    Возвращает текстовое представление ячейки (для заголовков и проверки строк).
+
+    Логические ячейки (t="b") возвращаются как TRUE/FALSE, ошибки (t="e") - как текст
+    ошибки (#N/A, #DIV/0!), поэтому ни те, ни другие не принимаются за числа.
+    """
+    cell_type = _TYPE_RE.search(attrs)
+    cell_type = cell_type.group(1) if cell_type else b"n"
+
+    if cell_type == b"inlineStr":
+        return html.unescape(b"".join(_TEXT_RE.findall(body or b"")).decode("utf-8"))
+
+    value = _VALUE_RE.search(body or b"")
+    if value is None:
+        return None
+    text = html.unescape(value.group(1).decode("utf-8"))
+    if cell_type == b"s":
+        return shared_strings.get(int(text))
+    if cell_type == b"b":
+        return "TRUE" if text.strip() == "1" else "FALSE"
+    return text
+
+
+def _cell_value(attrs, body, shared_strings):
+    """
+    Возвращает значение ячейки с учетом типа, как openpyxl: float для числовых
+    ячеек, bool для логических, текст для строк и ошибок, None для пустых.
+    """
+    text = _cell_text(attrs, body, shared_strings)
+    if text is None:
+        return None
+    cell_type = _TYPE_RE.search(attrs)
+    cell_type = cell_type.group(1) if cell_type else b"n"
+    if cell_type == b"n":
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    if cell_type == b"b":
+        return text == "TRUE"
+    return text
+
+
+def _is_number(text):
+    """Проверяет, что строка содержит число."""
+    try:
+        return float(text) == float(text)
+    except (TypeError, ValueError):
+        return False
+
+
+def _read_row(row_body, shared_strings, read_cell=_cell_text, empty=""):
+    """
+    Разбирает строку листа в список значений по позициям столбцов.
+
+    Args:
+        row_body (bytes): XML содержимого строки
+        shared_strings (SharedStrings): Таблица общих строк книги
+        read_cell (callable): _cell_text для заголовков, _cell_value для строк данных
+        empty: Значение пустых ячеек
+    """
+    values = []
+    position = 0
+    for cell in _CELL_RE.finditer(row_body):
+        attrs, body = cell.group(1), cell.group(2)
+        ref = _REF_RE.search(attrs)
+        if ref:
+            position = column_index(ref.group(1).decode("ascii"))
+        value = read_cell(attrs, body, shared_strings)
+        while len(values) <= position:
+            values.append(empty)
+        values[position] = empty if value is None else value
+        position += 1
+    return values
+
+
+def _target_cell_pattern(letters):
+    """
+    Компилирует выражение, находящее только ячейки в заданных столбцах.
+
+    Группы: буквы столбца, номер строки, атрибуты ячейки, содержимое ячейки.
+    """
+    alternatives = b"|".join(re.escape(letter.encode("ascii")) for letter in sorted(letters))
+    return re.compile(
+        rb'<c\b(?=[^>]*?\br="(' + alternatives + rb')([0-9]+)")((?:[^>/]|/(?!>))*)(?:/>|>(.*?)</c>)',
+        re.S,
+    )
+
+
+def _iter_row_pieces(stream, chunk_size):
+    """Читает XML листа блоками, разрезанными по границам строк (</row>)."""
+    buffer = b""
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            if buffer:
+                yield buffer
+            return
+        buffer += data
+        cut = buffer.rfind(_ROW_END)
+        if cut == -1:
+            continue
+        cut += len(_ROW_END)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+def _iter_sheet_pieces(stream, shared_strings, chunk_size):
+    """
+    Читает XML листа блоками по границам строк и находит строку заголовков.
+
+    Строка заголовков - первая строка листа с ячейками. Блок, в котором она
+    найдена, делится на две части: до конца строки заголовков и после нее.
+
+    Yields:
+        tuple: (заголовки - None для части листа до конца строки заголовков включительно,
+                блок XML)
+    """
+    headers = None
+    for piece in _iter_row_pieces(stream, chunk_size):
+        if headers is None:
+            for row in _ROW_RE.finditer(piece):
+                if _CELL_RE.search(row.group(1)):
+                    headers = _read_row(row.group(1), shared_strings)
+                    yield None, piece[:row.end()]
+                    piece = piece[row.end():]
+                    break
+            else:
+                yield None, piece
+                continue
+        yield headers, piece
+
+
+def _columns_by_letter(headers, selected):
+    """Сопоставляет буквы столбцов выбранным заголовкам (все столбцы с таким заголовком)."""
+    columns = {}
+    for column in selected:
+        for position, header in enumerate(headers):
+            if header == column:
+                columns[column_letters(position)] = column
+    return columns
+
+
+def patch_sheet(source, write, shared_strings, select_columns, next_value, chunk_size=None):
+    """
+    Потоково переписывает XML листа, заменяя числовые значения в выбранных столбцах.
+
+    Первая непустая строка листа считается строкой заголовков. Изменяются только
+    числовые ячейки и ячейки с числом в виде текста; ячейки с формулами и ячейки
+    без атрибута r остаются без изменений.
+
+    Args:
+        source: Файловый объект с XML листа
+        write (callable): Функция записи результирующих байтов
+        shared_strings (SharedStrings): Таблица общих строк книги
+        select_columns (callable): Получает список заголовков, возвращает выбранные заголовки
+        next_value (callable): Получает заголовок столбца, возвращает новое значение
+        chunk_size (int): Размер блока чтения
+
+    Returns:
+        tuple: (список заголовков, словарь {заголовок: количество замененных значений})
+    """
+    headers = None
+    counts = {}
+    columns_by_letter = {}
+    target_re = None
+
+    def replace_cell(match):
+        letter = match.group(1).decode("ascii")
+        attrs, body = match.group(3), match.group(4)
+        if body is None or _FORMULA_RE.search(body):
+            return match.group(0)
+
+        cell_type = _TYPE_RE.search(attrs)
+        cell_type = cell_type.group(1) if cell_type else b"n"
+        if cell_type == b"n":
+            value = _VALUE_RE.search(body)
+            if value is None:
+                return match.group(0)
+            column = columns_by_letter[letter]
+            counts[column] += 1
+            new_value = repr(next_value(column)).encode("ascii")
+            return match.group(0)[:match.start(4) - match.start(0)] + \
+                body[:value.start(1)] + new_value + body[value.end(1):] + b"</c>"
+
+        if cell_type in (b"s", b"str", b"inlineStr") and _is_number(_cell_text(attrs, body, shared_strings)):
+            # Число, сохраненное как текст, становится числовой ячейкой
+            column = columns_by_letter[letter]
+            counts[column] += 1
+            new_value = repr(next_value(column)).encode("ascii")
+            return b"<c" + _TYPE_RE.sub(b"", attrs) + b"><v>" + new_value + b"</v></c>"
+
+        return match.group(0)
+
+    for piece_headers, piece in _iter_sheet_pieces(source, shared_strings, chunk_size or CHUNK_SIZE):
+        if piece_headers is not None and headers is None:
+            headers = piece_headers
+            columns_by_letter = _columns_by_letter(headers, select_columns(headers))
+            counts = dict.fromkeys(columns_by_letter.values(), 0)
+            if columns_by_letter:
+                target_re = _target_cell_pattern(columns_by_letter)
+        if target_re is not None:
+            piece = target_re.sub(replace_cell, piece)
+        write(piece)
+
+    return headers or [], counts
+
+
+def _selected_sheets(source, select_sheets):
+    sheets = workbook_sheets(source)
+    names = [name for name, _ in sheets]
+    selected = set(select_sheets(names) if select_sheets else names)
+    return [(name, path) for name, path in sheets if name in selected]
+
+
+def read_sample(source_path, select_sheets=None, max_rows=100, chunk_size=None):
+    """
+    Читает заголовки и первые строки листов без разбора остальной части листа.
+
+    XML листа читается небольшими блоками, чтение прекращается, как только
+    набрано max_rows строк после строки заголовков; общие строки разбираются
+    только до наибольшего встретившегося индекса.
+
+    Args:
+        source_path (str): Путь к книге
+        select_sheets (callable): Получает имена листов, возвращает читаемые (по умолчанию все)
+        max_rows (int): Количество строк данных в выборке
+        chunk_size (int): Размер блока чтения
+
+    Returns:
+        list: Для каждого листа кортеж (имя листа, список заголовков,
+              список строк - списков значений ячеек по позициям столбцов, см. _cell_value)
+    """
+    chunk_size = chunk_size or SAMPLE_CHUNK_SIZE
+    with zipfile.ZipFile(source_path) as source:
+        shared_strings = SharedStrings(source)
+        result = []
+        for name, sheet_path in _selected_sheets(source, select_sheets):
+            headers = []
+            rows = []
+            with source.open(sheet_path) as stream:
+                for headers, piece in _iter_sheet_pieces(stream, shared_strings, chunk_size):
+                    if headers is None:
+                        continue
+                    for row in _ROW_RE.finditer(piece):
+                        if len(rows) >= max_rows:
+                            break
+                        rows.append(_read_row(row.group(1), shared_strings, _cell_value, None))
+                    if len(rows) >= max_rows:
+                        break
+            result.append((name, headers or [], rows))
+    return result
+
+
+def iter_column_values(source_path, select_columns, select_sheets=None, chunk_size=None):
+    """
+    Потоково читает значения ячеек выбранных столбцов листов.
+
+    Разбираются только ячейки выбранных столбцов (с атрибутом r), в памяти
+    находится один блок XML.
+
+    Args:
+        source_path (str): Путь к книге
+        select_columns (callable): Получает имя листа и список заголовков, возвращает выбранные заголовки
+        select_sheets (callable): Получает имена листов, возвращает читаемые (по умолчанию все)
+        chunk_size (int): Размер блока чтения
+
+    Yields:
+        tuple: (имя листа, заголовок столбца, список номеров строк листа,
+                список значений ячеек (см. _cell_value)) для очередного блока XML
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    with zipfile.ZipFile(source_path) as source:
+        shared_strings = SharedStrings(source)
+        for name, sheet_path in _selected_sheets(source, select_sheets):
+            target_re = None
+            with source.open(sheet_path) as stream:
+                for headers, piece in _iter_sheet_pieces(stream, shared_strings, chunk_size):
+                    if headers is None:
+                        continue
+                    if target_re is None:
+                        columns_by_letter = _columns_by_letter(headers, select_columns(name, headers))
+                        if not columns_by_letter:
+                            break
+                        target_re = _target_cell_pattern(columns_by_letter)
+
+                    values = {}
+                    for cell in target_re.finditer(piece):
+                        rows, column_values = values.setdefault(
+                            columns_by_letter[cell.group(1).decode("ascii")], ([], []))
+                        rows.append(int(cell.group(2)))
+                        column_values.append(_cell_value(cell.group(3), cell.group(4), shared_strings))
+                    for column, (rows, column_values) in values.items():
+                        yield name, column, rows, column_values
+
+
+class RawZipWriter:
+    """
+    Минимальный писатель zip архива с копированием уже сжатых элементов.
+
+    Неизмененные элементы исходного архива переносятся как есть, без распаковки
+    и повторного сжатия. Новые элементы сжимаются deflate потоково.
+    Архивы, требующие zip64 (элементы или смещения больше 4 ГБ), не поддерживаются.
+    """
+
+    def __init__(self, path, compresslevel=6):
+        self._file = open(path, "wb")
+        self._entries = []
+        self._compresslevel = compresslevel
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+    @staticmethod
+    def _dos_datetime(date_time):
+        year, month, day, hour, minute, second = date_time
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+    def _write_local_header(self, info, flags, method, crc, compress_size, file_size):
+        name = info.filename.encode("utf-8")
+        dos_time, dos_date = self._dos_datetime(info.date_time)
+        offset = self._file.tell()
+        self._file.write(_LOCAL_HEADER.pack(
+            _LOCAL_SIGNATURE, 20, flags, method, dos_time, dos_date,
+            crc, compress_size, file_size, len(name), 0,
+        ))
+        self._file.write(name)
+        return offset
+
+    def _add_entry(self, info, flags, method, crc, compress_size, file_size, offset):
+        if max(compress_size, file_size, offset) >= _ZIP32_LIMIT:
+            raise ValueError(f"Элемент {info.filename} требует zip64, что не поддерживается")
+        self._entries.append((info, flags, method, crc, compress_size, file_size, offset))
+
+    @staticmethod
+    def _flags(info):
+        flags = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+        if not info.filename.isascii():
+            flags |= _FLAG_UTF8
+        return flags
+
+    def copy_raw(self, source_file, info):
+        """
+        Копирует элемент исходного архива в сжатом виде.
+
+        Args:
+            source_file: Открытый в бинарном режиме файл исходного архива
+            info (zipfile.ZipInfo): Описание копируемого элемента
+        """
+        source_file.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(source_file.read(_LOCAL_HEADER.size))
+        if header[0] != _LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile(f"Поврежден заголовок элемента {info.filename}")
+        source_file.seek(header[9] + header[10], 1)
+
+        flags = self._flags(info)
+        offset = self._write_local_header(
+            info, flags, info.compress_type, info.CRC, info.compress_size, info.file_size
+        )
+        remaining = info.compress_size
+        while remaining:
+            block = source_file.read(min(remaining, _COPY_BLOCK))
+            if not block:
+                raise zipfile.BadZipFile(f"Элемент {info.filename} обрезан")
+            self._file.write(block)
+            remaining -= len(block)
+
+        self._add_entry(info, flags, info.compress_type, info.CRC,
+                        info.compress_size, info.file_size, offset)
+
+    def write_deflated(self, info, produce):
+        """
+        Записывает новый элемент со сжатием deflate.
+
+        Args:
+            info (zipfile.ZipInfo): Имя, дата и атрибуты элемента
+            produce (callable): Получает функцию записи и передает в нее несжатые данные
+
+        Returns:
+            Результат вызова produce
+        """
+        flags = self._flags(info) & _FLAG_UTF8
+        offset = self._write_local_header(info, flags, zipfile.ZIP_DEFLATED, 0, 0, 0)
+        compressor = zlib.compressobj(self._compresslevel, zlib.DEFLATED, -15)
+        state = {"crc": 0, "size": 0, "compressed": 0}
+
+        def write(data):
+            state["crc"] = zlib.crc32(data, state["crc"])
+            state["size"] += len(data)
+            compressed = compressor.compress(data)
+            state["compressed"] += len(compressed)
+            self._file.write(compressed)
+
+        result = produce(write)
+        tail = compressor.flush()
+        state["compressed"] += len(tail)
+        self._file.write(tail)
+
+        # Заполняем контрольную сумму и размеры в локальном заголовке
+        end = self._file.tell()
+        self._file.seek(offset + 14)
+        self._file.write(struct.pack("<III", state["crc"], state["compressed"], state["size"]))
+        self._file.seek(end)
+
+        self._add_entry(info, flags, zipfile.ZIP_DEFLATED, state["crc"],
+                        state["compressed"], state["size"], offset)
+        return result
+
+    def close(self):
+        """Записывает центральный каталог и закрывает архив."""
+        directory_offset = self._file.tell()
+        for info, flags, method, crc, compress_size, file_size, offset in self._entries:
+            name = info.filename.encode("utf-8")
+            dos_time, dos_date = self._dos_datetime(info.date_time)
+            self._file.write(_CENTRAL_HEADER.pack(
+                _CENTRAL_SIGNATURE, (info.create_system << 8) | 20, 20, flags, method,
+                dos_time, dos_date, crc, compress_size, file_size, len(name), 0, 0, 0,
+                info.internal_attr, info.external_attr, offset,
+            ))
+            self._file.write(name)
+        directory_size = self._file.tell() - directory_offset
+
+        if len(self._entries) > 0xFFFF or directory_offset >= _ZIP32_LIMIT:
+            self._file.close()
+            raise ValueError("Архив требует zip64, что не поддерживается")
+        self._file.write(_END_RECORD.pack(
+            _END_SIGNATURE, 0, 0, len(self._entries), len(self._entries),
+            directory_size, directory_offset, 0,
+        ))
+        self._file.close()
+
+
+def _needs_zip64(source, source_path):
+    """Проверяет, что архив слишком велик для RawZipWriter."""
+    return os.path.getsize(source_path) >= _ZIP32_LIMIT or len(source.infolist()) > 0xFFFF or any(
+        info.file_size >= _ZIP32_LIMIT for info in source.infolist()
+    )
+
+
+def patch_workbook(source_path, target_path, select_columns, next_value, select_sheets=None):
+    """
+    Создает копию книги с замененными значениями в выбранных столбцах листов.
+
+    Архив открывается один раз, выбранные листы обрабатываются за один проход.
+    Все части архива, кроме XML выбранных листов, копируются в сжатом виде без
+    изменений; заново сжимаются только измененные листы и xl/workbook.xml
+    (см. full_calc_on_load), чтобы зависящие от замененных значений формулы
+    были пересчитаны при открытии.
+
+    Args:
+        source_path (str): Путь к исходной книге
+        target_path (str): Путь к результирующей книге
+        select_columns (callable): Получает имя листа и список заголовков, возвращает выбранные заголовки
+        next_value (callable): Получает имя листа и заголовок столбца, возвращает новое значение
+        select_sheets (callable): Получает имена листов, возвращает обрабатываемые
+                                  (по умолчанию - только первый лист)
+
+    Returns:
+        list: Для каждого обработанного листа кортеж
+              (имя листа, список заголовков, словарь {заголовок: количество замен})
+    """
+    with zipfile.ZipFile(source_path) as source:
+        sheets = workbook_sheets(source)
+        names = [name for name, _ in sheets]
+        selected = set(select_sheets(names) if select_sheets else names[:1])
+        sheet_names = {path: name for name, path in sheets if name in selected}
+        shared_strings = SharedStrings(source)
+        results = {}
+        replaced = {}
+        if sheet_names:
+            replaced[_WORKBOOK_PATH] = full_calc_on_load(source.read(_WORKBOOK_PATH))
+
+        def patch(name, sheet_stream, write):
+            results[name] = patch_sheet(
+                sheet_stream, write, shared_strings,
+                lambda headers: select_columns(name, headers),
+                lambda column: next_value(name, column),
+            )
+
+        if _needs_zip64(source, source_path):
+            _patch_with_zipfile(source, target_path, sheet_names, patch, replaced)
+        else:
+            with open(source_path, "rb") as source_file, RawZipWriter(target_path) as target:
+                for info in source.infolist():
+                    name = sheet_names.get(info.filename)
+                    if name is not None:
+                        with source.open(info) as sheet_stream:
+                            target.write_deflated(info, lambda write: patch(name, sheet_stream, write))
+                    elif info.filename in replaced:
+                        target.write_deflated(info, lambda write: write(replaced[info.filename]))
+                    else:
+                        target.copy_raw(source_file, info)
+
+    return [(name, *results[name]) for name in names if name in results]
+
+
+def _patch_with_zipfile(source, target_path, sheet_names, patch, replaced):
+    """Запасной путь через zipfile для архивов zip64: элементы распаковываются и сжимаются заново."""
+    with zipfile.ZipFile(target_path, "w", allowZip64=True) as target:
+        for info in source.infolist():
+            name = sheet_names.get(info.filename)
+            if name is not None:
+                with source.open(info) as sheet_stream, \
+                        target.open(_copy_info(info), "w", force_zip64=True) as out:
+                    patch(name, sheet_stream, out.write)
+            elif info.filename in replaced:
+                with target.open(_copy_info(info), "w", force_zip64=True) as out:
+                    out.write(replaced[info.filename])
+            else:
+                with source.open(info) as member, target.open(_copy_info(info), "w", force_zip64=True) as out:
+                    while True:
+                        block = member.read(_COPY_BLOCK)
+                        if not block:
+                            break
+                        out.write(block)
+
+
+def _copy_info(info):
+    """Создает описание элемента архива с теми же именем, датой и методом сжатия."""
+    copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    copy.create_system = info.create_system
+    return copy